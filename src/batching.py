@@ -0,0 +1,153 @@
+"""
+Helpers for batched classification: pack several samples into one structured prompt,
+parse the JSON list of labels that comes back, and meter throughput and token usage.
+"""
+
+import json
+import threading
+import time
+
+BATCH_LABELS = ("yes", "no")
+
+
+def estimate_tokens(text):
+    """
+    Rough token count (about 4 characters per token for English text).
+    """
+    return max(1, len(str(text)) // 4)
+
+
+def pack_batches(samples, batch_size, token_budget=6000):
+    """
+    Split samples into consecutive batches of at most batch_size items whose estimated
+    prompt size stays within token_budget. A single oversized sample gets its own batch.
+
+    Args:
+        samples (list): (context, question) tuples.
+        batch_size (int): Maximum number of samples per batch.
+        token_budget (int): Maximum estimated prompt tokens per batch.
+    Returns:
+        list: Lists of (index, (context, question)) pairs, in input order.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for idx, (context, question) in enumerate(samples):
+        tokens = estimate_tokens(context) + estimate_tokens(question)
+        if current and (len(current) >= batch_size or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append((idx, (context, question)))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def render_batch_prompt(samples):
+    """
+    Build one prompt asking for a JSON array with one yes/no label per sample.
+    """
+    parts = [
+        "You are a website classification model.",
+        f"Classify each of the following {len(samples)} numbered contents as a funding opportunity or not.",
+        f"Answer with a JSON array of exactly {len(samples)} strings, each \"yes\" or \"no\", "
+        "in the same order as the items, and nothing else.",
+    ]
+    for number, (context, question) in enumerate(samples, start=1):
+        parts.append(f"### Item {number}\nQuestion: {question}\nContent: {context}")
+    return "\n\n".join(parts)
+
+
+def prepare_batches(samples, batch_size, token_budget=6000):
+    """
+    Pack samples with pack_batches and render each batch's prompt once.
+
+    Returns:
+        list: (batch, prompt) pairs, batch being a list of (index, (context, question)) pairs.
+    """
+    return [(batch, render_batch_prompt([sample for _, sample in batch]))
+            for batch in pack_batches(samples, batch_size, token_budget)]
+
+
+def parse_batch_answers(response, expected):
+    """
+    Parse a JSON array of yes/no labels from the model response.
+
+    Returns:
+        list or None: The labels in order, or None if the response is malformed,
+        has the wrong length or contains anything other than yes/no.
+    """
+    text = str(response)
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        labels = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(labels, list) or len(labels) != expected:
+        return None
+    labels = [str(label).strip().lower().replace('.', '') for label in labels]
+    if any(label not in BATCH_LABELS for label in labels):
+        return None
+    return labels
+
+
+class ThroughputMeter:
+    """
+    Counts labels produced and (estimated) tokens spent so runs can report
+    labels per second and tokens per label.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self.labels = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.fallbacks = 0
+
+    def add_tokens(self, prompt, completion):
+        with self._lock:
+            self.prompt_tokens += estimate_tokens(prompt)
+            self.completion_tokens += estimate_tokens(completion)
+
+    def add_labels(self, count):
+        with self._lock:
+            self.labels += count
+
+    def add_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        tokens = self.prompt_tokens + self.completion_tokens
+        return {
+            "labels": self.labels,
+            "seconds": elapsed,
+            "labels_per_second": self.labels / elapsed if elapsed else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_label": tokens / self.labels if self.labels else 0.0,
+            "batch_fallbacks": self.fallbacks,
+        }
+
+    def print_summary(self, batch_size=1):
+        stats = self.summary()
+        mode = f"batch size {batch_size}" if batch_size > 1 else "one row per request"
+        print(f"Throughput ({mode}): {stats['labels']} label(s) in {stats['seconds']:.2f}s = "
+              f"{stats['labels_per_second']:.2f} labels/s, ~{stats['tokens_per_label']:.0f} tokens/label")
+        if stats["batch_fallbacks"]:
+            print(f"Malformed batches re-run per row: {stats['batch_fallbacks']}")
+
+
+# Process-wide meter shared by the classifier modules
+THROUGHPUT = ThroughputMeter()
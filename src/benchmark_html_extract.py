@@ -0,0 +1,96 @@
+"""
+Benchmark the HTML text-extraction backends on the data/html corpus.
+
+For every available backend this reports documents per second, peak resident memory and
+how many documents produce output different from the BeautifulSoup reference. Each backend
+runs in a fresh interpreter and memory is its peak RSS (ru_maxrss), so allocations made by
+C libraries (libxml2 for lxml, Lexbor for selectolax) are counted too. The interpreter,
+the loaded corpus and the backend's imports are part of that peak.
+
+Usage:
+    python src/benchmark_html_extract.py [--html-dir data/html] [--max-length 2000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from html_extract import available_backends, extract_text
+
+
+def load_corpus(html_dir):
+    files = sorted(f for f in os.listdir(html_dir) if f.endswith(".txt"))
+    docs = []
+    for filename in files:
+        with open(os.path.join(html_dir, filename), "r", encoding="utf-8") as f:
+            docs.append(f.read())
+    return docs
+
+
+def _peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_backend(backend, html_dir, max_length, repeat):
+    """
+    Extract the corpus with one backend in this process and return its measurements.
+    """
+    docs = load_corpus(html_dir)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [extract_text(doc, max_length, backend=backend) for doc in docs]
+    elapsed = time.perf_counter() - start
+    return {"docs_per_second": len(docs) * repeat / elapsed, "peak_rss_bytes": _peak_rss_bytes(),
+            "outputs": outputs}
+
+
+def benchmark_backend(backend, html_dir, max_length, repeat):
+    """
+    Run run_backend in a fresh interpreter, so peak RSS belongs to this backend alone.
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), "--html-dir", html_dir, "--max-length", str(max_length),
+           "--repeat", str(repeat), "--run-backend", backend]
+    output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    default_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "html")
+    parser = argparse.ArgumentParser(description="Benchmark HTML text-extraction backends.")
+    parser.add_argument("--html-dir", default=default_dir, help="Directory of raw HTML .txt files")
+    parser.add_argument("--max-length", type=int, default=2000, help="Characters of text to keep (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the corpus (default: 3)")
+    parser.add_argument("--run-backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_backend:
+        print(json.dumps(run_backend(args.run_backend, args.html_dir, args.max_length, args.repeat)))
+        raise SystemExit(0)
+
+    if not os.path.isdir(args.html_dir):
+        print(f"HTML directory not found: {args.html_dir}")
+        raise SystemExit(1)
+    docs = load_corpus(args.html_dir)
+    if not docs:
+        print(f"No .txt files in {args.html_dir}")
+        raise SystemExit(1)
+    print(f"Benchmarking {len(docs)} documents, max_length={args.max_length}, {args.repeat} pass(es)\n")
+
+    backends = available_backends()
+    reference = None
+    if "bs4" in backends:
+        reference = [extract_text(doc, args.max_length, backend="bs4") for doc in docs]
+
+    print(f"{'backend':<12} {'docs/s':>10} {'peak RSS MB':>12} {'mismatches':>11}")
+    for backend in backends:
+        result = benchmark_backend(backend, args.html_dir, args.max_length, args.repeat)
+        outputs = result["outputs"]
+        mismatches = "n/a" if reference is None else sum(1 for a, b in zip(outputs, reference) if a != b)
+        print(f"{backend:<12} {result['docs_per_second']:>10.1f} {result['peak_rss_bytes'] / 1e6:>12.1f} "
+              f"{mismatches:>11}")
@@ -0,0 +1,180 @@
+"""
+Offline, deterministic throughput benchmark for the evaluation tasks.
+
+Starts the local mock LLM server (mock_llm_server.py), writes synthetic math, HTML and
+Markdown datasets to a temporary data directory, and runs each task of main.py in a
+subprocess against the mock. For every task it reports rows/sec, p95 module latency and
+peak RSS, and compares them with a stored baseline so concurrency, caching and batching
+changes can be measured without network access or an API key.
+
+Usage:
+    python src/benchmark_suite.py                                  # compare against the baseline
+    python src/benchmark_suite.py --update-baseline                # record a new baseline
+    python src/benchmark_suite.py --latency-ms 300 --rate-limit-rate 0.05 -- --concurrency 8 --batch-size 4
+Arguments after "--" are passed to every main.py run.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_llm_server import POSITIVE_MARKER, start_mock_server
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(SRC_DIR), "data", "perf_baseline.json")
+
+TASKS = ("math", "html", "md", "benchmark")
+
+# Component whose p95 latency is reported for each task
+TASK_COMPONENTS = {
+    "math": ("MathClassifierModule",),
+    "html": ("ClassifierModule", "BatchClassifierModule"),
+    "md": ("ClassifierModule", "BatchClassifierModule"),
+    "benchmark": ("ClassifierModule", "BatchClassifierModule"),
+}
+
+FILLER = ("Our organisation publishes news, events and reports about research and innovation. "
+          "Read more about our team, partners and recent projects. ")
+
+
+def write_datasets(data_dir, rows, seed=0):
+    """
+    Write deterministic synthetic datasets; half of the pages contain the mock's positive marker.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(data_dir, "math_addition_questions.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["context", "question", "answer"])
+        for _ in range(rows):
+            a, b = rng.randint(0, 100), rng.randint(0, 100)
+            writer.writerow(["question", f"What is {a} + {b}?", a + b])
+    for kind, label in (("html", "HTML"), ("md", "Markdown")):
+        with open(os.path.join(data_dir, f"{kind}_content_classification.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["context", "question", "answer", "source"])
+            for i in range(rows):
+                positive = i % 2 == 0
+                body = FILLER * rng.randint(3, 12)
+                context = f"{POSITIVE_MARKER.capitalize()} before the deadline. {body}" if positive else body
+                if kind == "md":
+                    context = "# Page\n\n" + context
+                writer.writerow([context, f"Is the following {label} page a website of a funding opportunity?",
+                                 "yes" if positive else "no", f"{kind}_{i}_{'yes' if positive else 'no'}"])
+
+
+def run_task(task, rows, api_base, data_dir, extra_args):
+    """
+    Run one main.py task against the mock and return its measurements.
+    """
+    metrics_path = os.path.join(data_dir, f"metrics_{task}.json")
+    log_path = os.path.join(data_dir, f"run_{task}.log")
+    cmd = [sys.executable, os.path.join(SRC_DIR, "main.py"), "--task", task, "--cache", "off", "--rpm", "0",
+           "--limit", str(rows), "--metrics-json", metrics_path] + list(extra_args)
+    env = dict(os.environ, OPENROUTER_API_BASE=api_base, OPENROUTER_API_KEY="mock",
+               CLASSIFIER_DATA_DIR=data_dir, LITELLM_LOCAL_MODEL_COST_MAP="True")
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+        # wait4 gives this child's own resource usage, including its peak RSS
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Task {task} failed with exit code {proc.returncode}; see {log_path}")
+
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        metrics = json.load(f)
+    # The task's own heavy imports (DSPy, pandas, LiteLLM) are loaded inside the "task" stage;
+    # they are a startup cost measured by startup_benchmark.py, not part of the throughput
+    stages = metrics["stages_seconds"]
+    task_seconds = stages.get("task", wall) - stages.get("imports", 0.0)
+    p95 = 0.0
+    for component in TASK_COMPONENTS[task]:
+        if component in metrics["calls"]:
+            p95 = max(p95, metrics["calls"][component]["p95_seconds"])
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "rows": rows,
+        "task_seconds": round(task_seconds, 4),
+        "wall_seconds": round(wall, 4),
+        "rows_per_second": round(rows / task_seconds, 3) if task_seconds else 0.0,
+        "p95_latency_seconds": round(p95, 4),
+        "peak_rss_mb": round(peak_mb, 1),
+        "retries": metrics.get("retries", 0),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of regression messages (throughput down, latency or memory up by more than tolerance).
+    """
+    regressions = []
+    for task, current in results.items():
+        previous = baseline.get(task)
+        if not previous:
+            continue
+        if current["rows_per_second"] < previous["rows_per_second"] * (1 - tolerance):
+            regressions.append(f"{task}: rows/sec {current['rows_per_second']} < baseline {previous['rows_per_second']}")
+        if current["p95_latency_seconds"] > previous["p95_latency_seconds"] * (1 + tolerance):
+            regressions.append(f"{task}: p95 {current['p95_latency_seconds']}s > baseline {previous['p95_latency_seconds']}s")
+        if current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{task}: peak RSS {current['peak_rss_mb']}MB > baseline {previous['peak_rss_mb']}MB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark against a local mock LLM server.")
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=list(TASKS))
+    parser.add_argument("--rows", type=int, default=100, help="Rows per task (default: 100)")
+    parser.add_argument("--latency-ms", type=float, default=100, help="Mock response latency (default: 100)")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Mock latency jitter (default: 20)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative change before a metric counts as a regression (default: 0.2)")
+    args, extra_args = parser.parse_known_args()
+    extra_args = [a for a in extra_args if a != "--"]
+
+    server, api_base = start_mock_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    print(f"Mock LLM server on {api_base} (latency {args.latency_ms}±{args.jitter_ms}ms, "
+          f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%})")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_datasets(data_dir, args.rows, seed=args.seed)
+        print(f"{'task':<10} {'rows/s':>9} {'p95 s':>8} {'peak MB':>9} {'retries':>8}")
+        for task in args.tasks:
+            results[task] = run_task(task, args.rows, api_base, data_dir, extra_args)
+            r = results[task]
+            print(f"{task:<10} {r['rows_per_second']:>9.2f} {r['p95_latency_seconds']:>8.3f} "
+                  f"{r['peak_rss_mb']:>9.1f} {r['retries']:>8}")
+    server.shutdown()
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
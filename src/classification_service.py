@@ -0,0 +1,297 @@
+"""
+Resident HTTP classification service with request micro-batching.
+
+The process keeps the classifier modules (and their dspy/LiteLLM clients) warm, so a request
+only pays for inference. Rows from concurrent requests are queued and dispatched together:
+the dispatcher waits up to a short window for a full micro-batch, then classifies it through
+the shared evaluation engine (rate limiting, retries, and with --batch-size > 1 several rows
+per LLM request). When the queue is full, or the upstream provider is rate-limiting and a
+full micro-batch is already waiting, new requests are rejected with HTTP 429 and a
+Retry-After header instead of piling up.
+
+Endpoints:
+    POST /classify         {"context": "...", "question": "..."}                  -> {"answer": "yes"}
+    POST /classify_batch   {"items": [{"context": "...", "question": "..."}, ...]} -> {"answers": [...]}
+    GET  /metrics          Prometheus text: queue depth, in-flight rows, request latency, LLM telemetry
+    GET  /stats            Service counters as JSON
+    GET  /healthz
+
+Usage (end to end against the local mock LLM):
+    python src/mock_llm_server.py --port 8099 --latency-ms 200 &
+    OPENROUTER_API_BASE=http://127.0.0.1:8099/v1 OPENROUTER_API_KEY=mock python src/main.py --task serve --port 8080
+    curl -s localhost:8080/classify -d '{"context": "Apply for this grant before May."}'
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from evaluation_engine import RowError
+from telemetry import TELEMETRY
+
+DEFAULT_QUESTION = "Is the following page a website of a funding opportunity?"
+
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Item:
+    __slots__ = ("sample", "future", "enqueued")
+
+    def __init__(self, sample):
+        self.sample = sample
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Queue of pending rows that are classified in micro-batches by a dispatcher thread.
+
+    Args:
+        classify_fn (callable): Takes a list of (context, question) samples, returns their answers in order.
+        max_batch (int): Maximum rows per micro-batch.
+        window_ms (float): How long the oldest queued row may wait for the micro-batch to fill.
+        max_queue (int): Queued rows beyond which requests are rejected.
+        workers (int): Micro-batches classified at the same time.
+        engine (EvaluationEngine): Engine whose upstream backoff state drives backpressure (optional).
+    """
+
+    def __init__(self, classify_fn, max_batch=16, window_ms=20, max_queue=256, workers=2, engine=None):
+        self.classify_fn = classify_fn
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000.0
+        self.max_queue = max_queue
+        self.engine = engine
+        self.queue = deque()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max(1, workers))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._stopped = False
+        self.inflight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(self, samples):
+        """
+        Queue samples and return one Future per sample; raises Overloaded to apply backpressure.
+        """
+        items = [_Item(sample) for sample in samples]
+        with self._cond:
+            backoff = self.engine.backoff_remaining() if self.engine is not None else 0.0
+            if len(self.queue) + len(items) > self.max_queue:
+                self.rejected += len(items)
+                raise Overloaded(f"queue full ({len(self.queue)} rows waiting)", max(1.0, backoff))
+            if backoff > 0 and len(self.queue) >= self.max_batch:
+                self.rejected += len(items)
+                raise Overloaded("upstream rate limited", backoff)
+            self.queue.extend(items)
+            self.accepted += len(items)
+            self._cond.notify()
+        return [item.future for item in items]
+
+    def _dispatch(self):
+        while True:
+            # Rows stay queued (and count as queue depth) until a worker slot is free
+            self._slots.acquire()
+            with self._cond:
+                while not self.queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    self._slots.release()
+                    return
+                deadline = self.queue[0].enqueued + self.window
+                while len(self.queue) < self.max_batch and not self._stopped:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self.queue.popleft() for _ in range(min(self.max_batch, len(self.queue)))]
+                self.inflight += len(batch)
+                self.batches += 1
+                self.batched_rows += len(batch)
+            self._pool.submit(self._classify, batch)
+
+    def _classify(self, batch):
+        started = time.perf_counter()
+        for item in batch:
+            TELEMETRY.record_call("service.queue_wait", started - item.enqueued)
+        try:
+            answers = self.classify_fn([item.sample for item in batch])
+            for item, answer in zip(batch, answers):
+                # A failed row only fails the request it came from
+                if isinstance(answer, RowError):
+                    item.future.set_exception(answer.exc)
+                else:
+                    item.future.set_result(answer)
+        except Exception as e:
+            for item in batch:
+                item.future.set_exception(e)
+        finally:
+            with self._cond:
+                self.inflight -= len(batch)
+            self._slots.release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self.queue),
+                "inflight_rows": self.inflight,
+                "accepted_rows": self.accepted,
+                "rejected_rows": self.rejected,
+                "batches": self.batches,
+                "mean_batch_rows": self.batched_rows / self.batches if self.batches else 0.0,
+                "upstream_backoff_seconds": self.engine.backoff_remaining() if self.engine is not None else 0.0,
+            }
+
+    def to_prometheus(self):
+        stats = self.stats()
+        lines = []
+        for metric, key, kind, help_text in (
+            ("service_queue_depth", "queue_depth", "gauge", "Rows waiting to be dispatched."),
+            ("service_inflight_rows", "inflight_rows", "gauge", "Rows being classified."),
+            ("service_upstream_backoff_seconds", "upstream_backoff_seconds", "gauge",
+             "Remaining upstream backoff after a 429/5xx."),
+            ("service_accepted_rows_total", "accepted_rows", "counter", "Rows accepted."),
+            ("service_rejected_rows_total", "rejected_rows", "counter", "Rows rejected by backpressure."),
+            ("service_batches_total", "batches", "counter", "Micro-batches dispatched."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {stats[key]}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._pool.shutdown(wait=True)
+
+
+class ClassificationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    batcher = None  # set by make_server
+    request_timeout = 300.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if not isinstance(body, bytes):
+            body = (json.dumps(body) if content_type == "application/json" else str(body)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/healthz":
+            self._send(200, {"status": "ok"})
+        elif path == "/stats":
+            self._send(200, self.batcher.stats())
+        elif path == "/metrics":
+            self._send(200, self.batcher.to_prometheus() + TELEMETRY.to_prometheus(),
+                       content_type="text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path not in ("/classify", "/classify_batch"):
+            self._send(404, {"error": "not found"})
+            return
+        start = time.perf_counter()
+        failed = True
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                items = payload.get("items") if path == "/classify_batch" else [payload]
+                if not isinstance(items, list) or not items:
+                    raise ValueError("expected a JSON object" if path == "/classify" else "expected a non-empty 'items' list")
+                samples = [(str(item.get("context", "")), str(item.get("question") or DEFAULT_QUESTION))
+                           for item in items]
+            except (ValueError, AttributeError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            try:
+                futures = self.batcher.submit(samples)
+            except Overloaded as e:
+                self._send(429, {"error": str(e)}, headers={"Retry-After": str(max(1, round(e.retry_after)))})
+                return
+            try:
+                answers = [future.result(timeout=self.request_timeout) for future in futures]
+            except FutureTimeout:
+                self._send(504, {"error": "classification timed out"})
+                return
+            except Exception as e:
+                self._send(502, {"error": f"{type(e).__name__}: {e}"})
+                return
+            failed = False
+            elapsed = time.perf_counter() - start
+            if path == "/classify":
+                self._send(200, {"answer": answers[0], "latency_seconds": round(elapsed, 4)})
+            else:
+                self._send(200, {"answers": answers, "latency_seconds": round(elapsed, 4)})
+        finally:
+            TELEMETRY.record_call(f"service{path}", time.perf_counter() - start, error=failed)
+
+
+class ClassificationServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of concurrent clients would overflow the default listen backlog of 5
+    request_queue_size = 128
+
+
+def make_server(batcher, host="127.0.0.1", port=8080, request_timeout=300.0):
+    """
+    Build (but do not start) the HTTP server for a MicroBatcher.
+    """
+    handler = type("ConfiguredClassificationHandler", (ClassificationHandler,),
+                   {"batcher": batcher, "request_timeout": request_timeout})
+    return ClassificationServer((host, port), handler)
+
+
+def serve(classify_fn, host="127.0.0.1", port=8080, engine=None, max_batch=16, window_ms=20, max_queue=256,
+          workers=2, warmup=None):
+    """
+    Run the classification service until interrupted.
+
+    Args:
+        classify_fn (callable): Classifies a list of (context, question) samples.
+        warmup (callable): Called once before the server starts, e.g. to build the modules.
+    """
+    if warmup is not None:
+        start = time.perf_counter()
+        warmup()
+        print(f"Classifier warm in {time.perf_counter() - start:.2f}s")
+    batcher = MicroBatcher(classify_fn, max_batch=max_batch, window_ms=window_ms, max_queue=max_queue,
+                           workers=workers, engine=engine)
+    server = make_server(batcher, host, port)
+    print(f"Classification service listening on http://{host}:{server.server_port} "
+          f"(micro-batches of up to {max_batch} rows, {window_ms:g}ms window, queue limit {max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        stats = batcher.stats()
+        print(f"Service stopped: {stats['accepted_rows']} row(s) accepted, {stats['rejected_rows']} rejected, "
+              f"{stats['batches']} micro-batch(es), mean {stats['mean_batch_rows']:.1f} row(s) per batch")
@@ -0,0 +1,273 @@
+"""
+DSPy classifier modules and the other LLM client code used by main.py.
+
+Importing this module loads DSPy, so main.py only imports it once a task needs a classifier.
+LiteLLM (which DSPy calls into) and the telemetry callback are loaded by main.py's
+ClassifierRegistry when it builds the first module, outside the timed calls.
+"""
+
+import os
+import re
+from functools import cached_property
+from typing import Literal
+
+import dspy
+from dspy.utils.exceptions import AdapterParseError
+
+from batching import THROUGHPUT, parse_batch_answers, render_batch_prompt
+from llm_cache import get_cache
+from prompt_versions import PROMPT_VERSIONS
+from telemetry import TELEMETRY, install_litellm_callback
+
+# Can be overridden from the environment, e.g. to run against the local mock server
+OPENROUTER_API_BASE = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
+
+
+def cached_completion(module, prompt, compute):
+    """
+    Answer prompt from the response cache under the module's model and prompt version, or
+    call compute() on a miss.
+    """
+    return get_cache().cached_call(module.model_name, prompt, compute, prompt_version=module.PROMPT_VERSION)
+
+
+class ClassifierModule(dspy.Module):
+    # Bump in prompt_versions.py whenever the prompt template changes so cached responses are not reused
+    PROMPT_VERSION = PROMPT_VERSIONS["classify"]
+
+    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+        super().__init__()
+        self.model_name = model_name
+        self.model = dspy.LM(
+                    model=model_name,
+                    api_base=OPENROUTER_API_BASE,
+                    api_key=os.getenv("OPENROUTER_API_KEY"),
+                    cache=False,
+                    num_retries=0,
+                    metadata={"component": "ClassifierModule"},
+                    )
+        self.question = dspy.InputField(desc = "User's description and question")
+        self.answer = dspy.OutputField(desc = "1 word, Yes or No without any other additions or symbols")
+        self.chain_of_thought = dspy.ChainOfThought('description_question -> one_word_answer')
+
+    def forward(self, context, question):
+        prompt = f"""
+        You are a website classification model. \n
+        Classify the following content as a funding opportunity or not using only yes or no as an answer\n
+        without any other additions even a point: {question}\n{context}\n
+        """
+        answer = cached_completion(self, prompt, lambda: self._predict(prompt))
+        return dspy.Prediction(answer=answer)
+
+    def _predict(self, prompt):
+        with dspy.context(lm=self.model):
+            pred = self.chain_of_thought(description_question=prompt)
+        THROUGHPUT.add_tokens(prompt, f"{getattr(pred, 'reasoning', '')} {pred.one_word_answer}")
+        return pred.one_word_answer
+
+class MathClassifierModule(dspy.Module):
+    PROMPT_VERSION = PROMPT_VERSIONS["math"]
+
+    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+        super().__init__()
+        self.model_name = model_name
+        self.model = dspy.LM(model=model_name, api_base=OPENROUTER_API_BASE, cache=False, num_retries=0,
+                             metadata={"component": "MathClassifierModule"})
+
+    def forward(self, context, question):
+        prompt = f"{question}\n{context}\nyou are a math student,  answer only the number without any additional points or symbols."
+        response = cached_completion(self, prompt, lambda: self._complete(prompt))
+        # Extract only yes/no
+        answer = response.strip().split()[0].lower()
+        if answer not in ["yes", "no"]:
+            answer = response.strip().lower()
+        return dspy.Prediction(answer=answer)
+
+    def _complete(self, prompt):
+        response = self.model(prompt)
+        # Ensure response is string
+        if isinstance(response, list):
+            response = response[0]
+        return str(response)
+
+class BatchClassifierModule(dspy.Module):
+    """
+    Classifies several contents with one request: the samples are packed into a single
+    structured prompt and the model returns a JSON array with one yes/no label each.
+    """
+    PROMPT_VERSION = PROMPT_VERSIONS["batch"]
+
+    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+        super().__init__()
+        self.model_name = model_name
+        self.model = dspy.LM(
+                    model=model_name,
+                    api_base=OPENROUTER_API_BASE,
+                    api_key=os.getenv("OPENROUTER_API_KEY"),
+                    cache=False,
+                    num_retries=0,
+                    metadata={"component": "BatchClassifierModule"},
+                    )
+
+    def forward(self, samples, prompt=None):
+        # The prompt can be rendered once up front and shared, e.g. by a multi-model sweep
+        prompt = prompt or render_batch_prompt(samples)
+        response = cached_completion(self, prompt, lambda: self._complete(prompt))
+        # None when the batch is malformed or short; the caller then falls back to per-row calls
+        return dspy.Prediction(answers=parse_batch_answers(response, len(samples)))
+
+    def _complete(self, prompt):
+        response = self.model(prompt)
+        if isinstance(response, list):
+            response = response[0]
+        response = str(response)
+        THROUGHPUT.add_tokens(prompt, response)
+        return response
+
+def structured_output_adapter(model_name):
+    """
+    DSPy JSONAdapter when LiteLLM knows the model supports a response schema, so the provider
+    constrains the output to the signature's types (e.g. an enum of yes/no); otherwise None,
+    which keeps DSPy's default chat adapter and validates the typed field after decoding.
+    """
+    try:
+        import litellm
+
+        if litellm.supports_response_schema(model=model_name):
+            return dspy.JSONAdapter()
+    except Exception:
+        pass
+    return None
+
+
+def label_from_unparsed(exc, pattern):
+    """
+    First match of pattern in the raw response of a failed DSPy parse, or the response itself.
+    """
+    text = str(getattr(exc, "lm_response", "") or "")
+    match = re.search(pattern, text, flags=re.IGNORECASE)
+    return match.group(0).lower() if match else text.strip().lower()
+
+
+class ClassifyDirect(dspy.Signature):
+    """Classify the content as a funding opportunity (yes) or not (no)."""
+
+    description_question: str = dspy.InputField()
+    answer: Literal["yes", "no"] = dspy.OutputField()
+
+
+class AddDirect(dspy.Signature):
+    """Answer the math question with the resulting number only."""
+
+    question: str = dspy.InputField()
+    answer: int = dspy.OutputField()
+
+
+class DirectClassifierModule(ClassifierModule):
+    """
+    Low-latency variant of ClassifierModule: a single dspy.Predict call with no reasoning
+    trace, a yes/no typed output and a tight max_tokens cap.
+    """
+    PROMPT_VERSION = PROMPT_VERSIONS["classify-direct"]
+    # Room for the adapter's field markers around a one-word answer
+    MAX_TOKENS = 24
+
+    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+        dspy.Module.__init__(self)
+        self.model_name = model_name
+        self.model = dspy.LM(
+                    model=model_name,
+                    api_base=OPENROUTER_API_BASE,
+                    api_key=os.getenv("OPENROUTER_API_KEY"),
+                    cache=False,
+                    num_retries=0,
+                    max_tokens=self.MAX_TOKENS,
+                    metadata={"component": "DirectClassifierModule"},
+                    )
+        self.predict = dspy.Predict(ClassifyDirect)
+
+    @cached_property
+    def adapter(self):
+        # Resolved on the first cache miss, as it asks LiteLLM about the model
+        return structured_output_adapter(self.model_name)
+
+    def _predict(self, prompt):
+        try:
+            with dspy.context(lm=self.model, adapter=self.adapter):
+                answer = self.predict(description_question=prompt).answer
+        except AdapterParseError as e:
+            # Typically a capitalised or decorated label; recover it from the raw text
+            answer = label_from_unparsed(e, r"\b(yes|no)\b")
+        THROUGHPUT.add_tokens(prompt, answer)
+        return answer
+
+
+class DirectMathModule(MathClassifierModule):
+    """
+    Math counterpart of DirectClassifierModule: dspy.Predict with an integer output field.
+    """
+    PROMPT_VERSION = PROMPT_VERSIONS["math-direct"]
+    MAX_TOKENS = 24
+
+    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+        dspy.Module.__init__(self)
+        self.model_name = model_name
+        self.model = dspy.LM(model=model_name, api_base=OPENROUTER_API_BASE, cache=False, num_retries=0,
+                             max_tokens=self.MAX_TOKENS, metadata={"component": "DirectMathModule"})
+        self.predict = dspy.Predict(AddDirect)
+
+    @cached_property
+    def adapter(self):
+        return structured_output_adapter(self.model_name)
+
+    def forward(self, context, question):
+        prompt = f"{question}\n{context}".strip()
+        answer = cached_completion(self, prompt, lambda: self._predict(prompt))
+        return dspy.Prediction(answer=answer)
+
+    def _predict(self, prompt):
+        try:
+            with dspy.context(lm=self.model, adapter=self.adapter):
+                return str(self.predict(question=prompt).answer)
+        except AdapterParseError as e:
+            return label_from_unparsed(e, r"-?\d+")
+
+
+# Module class used for each task type held by the registry
+MODULE_KINDS = {
+    "classify": ClassifierModule,
+    "math": MathClassifierModule,
+    "batch": BatchClassifierModule,
+    "classify-direct": DirectClassifierModule,
+    "math-direct": DirectMathModule,
+}
+
+
+def ask_openrouter(prompt, model="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+    """
+    Send a prompt to the OpenRouter model using LiteLLM and return the model's response as a string.
+    Args:
+        prompt (str): The question or instruction to send to the model.
+        model (str): The OpenRouter model to use.
+    Returns:
+        str: The model's answer as a string.
+    """
+    def _complete():
+        from litellm import completion
+
+        response = completion(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            api_base=OPENROUTER_API_BASE,
+            metadata={"component": "ask_openrouter"},
+        )
+        # Try to extract the answer as a string
+        try:
+            return response.choices[0].message.content.strip()
+        except Exception:
+            return str(response)
+
+    with TELEMETRY.stage("imports"):
+        install_litellm_callback()
+    with TELEMETRY.track("ask_openrouter"):
+        return get_cache().cached_call(model, prompt, _complete, prompt_version=PROMPT_VERSIONS["ask"])
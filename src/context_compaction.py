@@ -0,0 +1,167 @@
+"""
+Token-budget-aware context compaction.
+
+Instead of cutting every page at a fixed number of characters, the compactor
+    1. splits each context into passages (lines, or sentences for single-line text),
+    2. drops boilerplate passages that repeat across a large share of the corpus
+       (navigation, cookie banners, footers), learnt in a first pass with fit();
+       passages containing funding vocabulary are never treated as boilerplate,
+    3. scores the remaining passages for relevance to the question and to funding
+       vocabulary, and keeps the best ones, in their original order, until the token
+       budget is used up.
+Tokens are counted with the target model's tokenizer through LiteLLM when available,
+falling back to a character-based estimate.
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter
+
+from batching import estimate_tokens
+
+# Words that signal a funding-opportunity page; passages containing them are preferred
+FUNDING_TERMS = (
+    "fund", "funding", "grant", "grants", "apply", "application", "applications", "deadline", "eligible",
+    "eligibility", "call", "proposal", "proposals", "award", "awards", "fellowship", "scholarship",
+    "budget", "financing", "financial", "support", "submit", "submission", "programme", "program",
+)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\s{3,}")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"the", "a", "an", "is", "of", "or", "and", "to", "following", "page", "website", "this", "it",
+              "html", "markdown", "in", "on", "for", "with", "be"}
+
+
+def split_passages(text):
+    """
+    Split a context into passages: non-empty lines, and sentences within long lines.
+    """
+    passages = []
+    for line in str(text).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) > 400:
+            passages.extend(p.strip() for p in _SENTENCE_SPLIT.split(line) if p.strip())
+        else:
+            passages.append(line)
+    return passages
+
+
+def _has_funding_terms(passage):
+    return any(w.startswith(FUNDING_TERMS) for w in _WORD.findall(passage.lower()))
+
+
+def _fingerprint(passage):
+    normalized = " ".join(_WORD.findall(passage.lower()))
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+def make_token_counter(model_name=None):
+    """
+    Return a function counting tokens with the model's tokenizer (via LiteLLM), or an estimate.
+    """
+    if model_name:
+        try:
+            import litellm
+
+            model = model_name.split("/", 1)[1] if model_name.startswith("openrouter/") else model_name
+            litellm.token_counter(model=model, text="probe")
+            return lambda text: litellm.token_counter(model=model, text=text)
+        except Exception:
+            pass
+    return estimate_tokens
+
+
+class ContextCompactor:
+    """
+    Args:
+        token_budget (int): Maximum context tokens kept per sample.
+        model_name (str): Model whose tokenizer is used for counting.
+        boilerplate_min_df (float): Share of documents a passage must appear in to count as boilerplate.
+        boilerplate_min_docs (int): Minimum number of documents for the same.
+    """
+
+    def __init__(self, token_budget=512, model_name=None, boilerplate_min_df=0.3, boilerplate_min_docs=3):
+        self.token_budget = token_budget
+        self.count_tokens = make_token_counter(model_name)
+        self.boilerplate_min_df = boilerplate_min_df
+        self.boilerplate_min_docs = boilerplate_min_docs
+        self.boilerplate = set()
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def fit(self, contexts):
+        """
+        Learn boilerplate passages from the corpus (any iterable of context strings).
+        """
+        doc_freq = Counter()
+        docs = 0
+        for context in contexts:
+            docs += 1
+            doc_freq.update({_fingerprint(p) for p in split_passages(context) if not _has_funding_terms(p)})
+        threshold = max(self.boilerplate_min_docs, self.boilerplate_min_df * docs)
+        self.boilerplate = {fp for fp, count in doc_freq.items() if count >= threshold}
+        return self
+
+    def _score(self, passage, position, query_terms):
+        words = _WORD.findall(passage.lower())
+        if not words:
+            return 0.0
+        hits = sum(1 for w in words if w in query_terms or w.startswith(FUNDING_TERMS))
+        # Density of relevant words, plus a small prior for the top of the page (title, intro)
+        return hits / len(words) ** 0.5 + (0.5 if position == 0 else 0.0)
+
+    def compact(self, context, question=""):
+        """
+        Return the context reduced to its most relevant non-boilerplate passages within the budget.
+        """
+        context = "" if context is None else str(context)
+        before = self.count_tokens(context) if context else 0
+        passages = split_passages(context)
+        # A page made only of boilerplate is kept as is rather than sent empty
+        passages = [p for p in passages if _fingerprint(p) not in self.boilerplate] or passages
+        query_terms = {w for w in _WORD.findall(str(question).lower()) if w not in _STOPWORDS}
+
+        ranked = sorted(range(len(passages)),
+                        key=lambda i: self._score(passages[i], i, query_terms), reverse=True)
+        chosen = []
+        used = 0
+        for i in ranked:
+            tokens = self.count_tokens(passages[i])
+            if used + tokens > self.token_budget:
+                continue
+            chosen.append(i)
+            used += tokens
+            if used >= self.token_budget:
+                break
+        if not chosen and ranked:
+            # Even the best passage is over budget on its own; keep a prefix of it
+            best = passages[ranked[0]]
+            compacted = best[:self.token_budget * 4]
+            used = self.count_tokens(compacted)
+        else:
+            compacted = "\n".join(passages[i] for i in sorted(chosen))
+
+        with self._lock:
+            self.samples += 1
+            self.tokens_before += before
+            self.tokens_after += used
+        return compacted
+
+    def summary(self):
+        return {
+            "samples": self.samples,
+            "boilerplate_passages": len(self.boilerplate),
+            "avg_context_tokens_before": self.tokens_before / self.samples if self.samples else 0.0,
+            "avg_context_tokens_after": self.tokens_after / self.samples if self.samples else 0.0,
+        }
+
+    def print_summary(self):
+        stats = self.summary()
+        print(f"Context compaction: {stats['samples']} sample(s), {stats['boilerplate_passages']} boilerplate "
+              f"passage(s) removed corpus-wide, avg context tokens {stats['avg_context_tokens_before']:.0f} -> "
+              f"{stats['avg_context_tokens_after']:.0f} (budget {self.token_budget})")
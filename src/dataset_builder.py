@@ -0,0 +1,144 @@
+"""
+Bulk builder for the HTML and Markdown classification datasets.
+
+Input files are parsed in a process pool and their rows streamed to the output CSV in a
+single write pass (sorted by filename), instead of re-reading and rewriting the whole CSV
+once per file. A manifest next to the CSV records each file's mtime, size and content hash;
+on rebuild only files that changed are parsed again and the rows of unchanged files are
+copied over from the previous CSV. The manifest also records the version of the row
+function's output (e.g. the HTML extractor backend); when it differs, every file is parsed again.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+DATASET_COLUMNS = ["context", "question", "answer", "source"]
+
+# Context cells hold whole pages; lift the csv module's 128KB field limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def file_hash(path):
+    """
+    SHA-256 of a file's content.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def manifest_path(csv_path):
+    return csv_path + ".manifest.json"
+
+
+def load_manifest(csv_path):
+    """
+    Return (version, {filename: file state}) of the last build, or (None, {}) if there is none.
+    """
+    path = manifest_path(csv_path)
+    if not os.path.exists(path) or not os.path.exists(csv_path):
+        return None, {}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest.get("files"), dict) and "version" in manifest:
+        return manifest["version"], manifest["files"]
+    # Manifest written before versions were recorded
+    return None, manifest
+
+
+def file_state(path, previous=None):
+    """
+    Manifest entry for path. The content hash is only recomputed when mtime or size changed.
+    """
+    stat = os.stat(path)
+    if previous and previous.get("mtime") == stat.st_mtime and previous.get("size") == stat.st_size:
+        return dict(previous)
+    return {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_hash(path)}
+
+
+def _iter_previous_rows(csv_path):
+    if not os.path.exists(csv_path):
+        return
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if "source" not in (reader.fieldnames or []):
+            # CSV from the old per-file generator; nothing can be reused
+            return
+        for row in reader:
+            yield row
+
+
+def build_dataset(input_dir, csv_path, extension, row_fn, workers=None, incremental=True, version=None):
+    """
+    Build a classification CSV from every file with the given extension in input_dir.
+
+    Args:
+        input_dir (str): Directory with the source files.
+        csv_path (str): Output CSV path.
+        extension (str): Source file extension, e.g. ".txt" or ".md".
+        row_fn (callable): Top-level (picklable) function mapping a file path to a row dict
+            with context, question and answer.
+        workers (int): Process pool size (None for one per CPU).
+        incremental (bool): Reuse rows of files unchanged since the last build.
+        version (str): Identifies the output of row_fn, e.g. html_extract.extractor_id(); rows
+            built under another version are not reused.
+    Returns:
+        dict: Counts of files parsed and reused.
+    """
+    filenames = sorted(f for f in os.listdir(input_dir) if f.endswith(extension))
+    previous_version, previous = load_manifest(csv_path) if incremental else (None, {})
+    if previous and previous_version != version:
+        print(f"Rows were built with {previous_version or 'an unrecorded version'}, not {version}; "
+              f"parsing every file again")
+        previous = {}
+        incremental = False
+
+    manifest = {}
+    changed = []
+    for filename in filenames:
+        state = file_state(os.path.join(input_dir, filename), previous.get(filename))
+        manifest[filename] = state
+        old = previous.get(filename)
+        if not old or old.get("sha256") != state["sha256"]:
+            changed.append(filename)
+    changed_set = set(changed)
+
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    tmp_path = csv_path + ".tmp"
+    parsed = reused = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Results come back in submission (filename) order while the pool works ahead
+        new_rows = pool.map(row_fn, [os.path.join(input_dir, f) for f in changed], chunksize=8)
+        # The previous CSV is sorted by source, so unchanged rows are merged in one sequential pass
+        old_rows = _iter_previous_rows(csv_path) if incremental else iter(())
+        old_row = next(old_rows, None)
+        with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+            writer = csv.DictWriter(out, fieldnames=DATASET_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            for filename in filenames:
+                while old_row is not None and old_row["source"] < filename:
+                    old_row = next(old_rows, None)
+                if filename in changed_set or old_row is None or old_row["source"] != filename:
+                    if filename not in changed_set:
+                        # Listed as unchanged but missing from the old CSV; parse it inline
+                        row = row_fn(os.path.join(input_dir, filename))
+                    else:
+                        row = next(new_rows)
+                    parsed += 1
+                else:
+                    row = old_row
+                    reused += 1
+                row = dict(row, source=filename)
+                writer.writerow(row)
+    os.replace(tmp_path, csv_path)
+
+    with open(manifest_path(csv_path), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "files": manifest}, f, indent=1, sort_keys=True)
+    print(f"Wrote {len(filenames)} rows to {csv_path} ({parsed} parsed, {reused} reused)")
+    return {"rows": len(filenames), "parsed": parsed, "reused": reused}
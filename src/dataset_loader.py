@@ -0,0 +1,122 @@
+"""
+Streaming dataset loader for the evaluation tasks.
+
+Rows are read lazily and yielded as lightweight Record tuples, so memory stays flat
+regardless of dataset size. CSV files are read in chunks, JSONL line by line and
+Parquet (if pyarrow is installed) batch by batch; only the columns the tasks use are
+loaded. offset/limit select a contiguous slice of the dataset; sharding.py splits it
+by a stable per-row key instead.
+"""
+
+import json
+import os
+from collections import namedtuple
+from itertools import islice
+
+# source is the file a row was built from (see dataset_builder.py), None for older datasets
+Record = namedtuple("Record", ["index", "context", "question", "answer", "source"])
+
+RECORD_COLUMNS = ("context", "question", "answer", "source")
+
+# Extensions tried, in order, when looking up a dataset by name
+DATASET_EXTENSIONS = (".csv", ".jsonl", ".parquet")
+
+
+def find_dataset(data_dir, name):
+    """
+    Return the path of data_dir/name with the first existing supported extension, or None.
+    """
+    for ext in DATASET_EXTENSIONS:
+        path = os.path.join(data_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _make_record(index, row):
+    context = row.get("context")
+    # Missing or empty cells come back as None / NaN / ""; the tasks expect empty strings
+    if context is None or context != context:
+        context = ""
+    return Record(index, context, row.get("question"), row.get("answer"), row.get("source") or None)
+
+
+def _iter_csv(path, chunksize):
+    import pandas as pd
+
+    reader = pd.read_csv(
+        path,
+        usecols=lambda column: column in RECORD_COLUMNS,
+        chunksize=chunksize,
+        dtype=str,
+        keep_default_na=False,
+    )
+    index = 0
+    for chunk in reader:
+        columns = [c for c in RECORD_COLUMNS if c in chunk.columns]
+        # itertuples on the projected columns avoids building a Series per row
+        for values in chunk[columns].itertuples(index=False, name=None):
+            yield _make_record(index, dict(zip(columns, values)))
+            index += 1
+
+
+def _iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        index = 0
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            yield _make_record(index, {c: row.get(c) for c in RECORD_COLUMNS})
+            index += 1
+
+
+def _iter_parquet(path, chunksize):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet datasets requires pyarrow (pip install pyarrow)")
+
+    parquet_file = pq.ParquetFile(path)
+    columns = [c for c in RECORD_COLUMNS if c in parquet_file.schema_arrow.names]
+    index = 0
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        for row in batch.to_pylist():
+            yield _make_record(index, row)
+            index += 1
+
+
+def iter_records(path, offset=0, limit=None, chunksize=500):
+    """
+    Lazily yield Records from a CSV, JSONL or Parquet dataset.
+
+    Args:
+        path (str): Dataset path; the format is picked from the extension.
+        offset (int): Number of leading rows to skip.
+        limit (int): Maximum number of rows to yield (None for all).
+        chunksize (int): Rows read per chunk for CSV and Parquet.
+    Yields:
+        Record: (index, context, question, answer, source), index being the row position in the file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        records = _iter_jsonl(path)
+    elif ext == ".parquet":
+        records = _iter_parquet(path, chunksize)
+    else:
+        records = _iter_csv(path, chunksize)
+    stop = offset + limit if limit is not None else None
+    return islice(records, offset, stop)
+
+
+def iter_chunks(iterable, size):
+    """
+    Group an iterable into lists of at most size items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,273 @@
+"""
+Shared evaluation engine used by every task in main.py.
+
+Rows are sent to the LLM concurrently through one bounded thread pool per engine, shared by
+every map() call, so concurrent callers (e.g. the service's micro-batch workers) together
+never have more than `concurrency` rows in flight. A token-bucket
+limiter keeps the request rate under the provider's requests-per-minute quota; a token
+is only taken when a call actually reaches the provider (see acquire_request_token), so
+answers served from the response cache are not rate limited. Calls that fail with a 429 or 5xx response are retried with exponential backoff.
+Results are always returned in the original row order; rows that still fail can be
+returned as RowError markers so one bad row does not abort a whole task. imap() streams
+rows through a rolling window instead of a fixed list, so one slow row does not hold
+back the rows after it.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from telemetry import TELEMETRY
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = ("RateLimitError", "ServiceUnavailableError", "InternalServerError")
+
+# Rate limiter of the EvaluationEngine attempt running on this thread, until it is charged
+_attempt = threading.local()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that allows `rate_per_minute` acquisitions per minute,
+    with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then consume it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait)
+
+
+def status_code_of(exc):
+    """
+    Best-effort extraction of the HTTP status code carried by an LLM client exception.
+    """
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _exception_chain(exc):
+    # Client libraries (e.g. DSPy around LiteLLM) often wrap the original error
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def is_retryable(exc):
+    """
+    True for rate-limit (429) and server-side (5xx) failures, including wrapped ones.
+    """
+    for err in _exception_chain(exc):
+        code = status_code_of(err)
+        if code is not None:
+            return code in RETRYABLE_STATUS_CODES or code >= 500
+        # Some providers surface rate limits without a status code attached
+        if type(err).__name__.endswith(RETRYABLE_ERROR_NAMES):
+            return True
+    return False
+
+
+def retry_after_of(exc):
+    """
+    Seconds requested by a Retry-After header on the failed response, if any.
+    """
+    for err in _exception_chain(exc):
+        headers = getattr(getattr(err, "response", None), "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            if value is not None:
+                return float(value)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def acquire_request_token():
+    """
+    Take a rate-limit token for the engine attempt running on this thread, right before it
+    sends a request. Called on response cache misses; at most one token is taken per attempt,
+    and it is a no-op outside EvaluationEngine.call or without a limiter.
+    """
+    limiter = getattr(_attempt, "limiter", None)
+    if limiter is not None:
+        _attempt.limiter = None
+        limiter.acquire()
+
+
+class RowError:
+    """
+    Placeholder result of a row whose call failed for good (non-retryable, or out of retries),
+    returned by EvaluationEngine.map(..., capture_errors=True) in place of the row's answer.
+    """
+
+    def __init__(self, exc):
+        self.exc = exc
+
+    def __str__(self):
+        return f"{type(self.exc).__name__}: {self.exc}"
+
+    def __repr__(self):
+        return f"RowError({self})"
+
+
+class EvaluationEngine:
+    """
+    Runs a function over a list of rows with bounded concurrency, rate limiting and retries.
+
+    Args:
+        concurrency (int): Maximum number of rows in flight at once.
+        rpm (float): Requests-per-minute limit shared by all workers (0 or None disables it).
+        max_retries (int): Retries per row on 429/5xx failures.
+        base_delay (float): First backoff delay in seconds; doubles on every retry.
+        max_delay (float): Upper bound for a single backoff delay.
+        track_as (str): If set, every attempt is timed in telemetry under this component name.
+    """
+
+    def __init__(self, concurrency=4, rpm=20, max_retries=5, base_delay=2.0, max_delay=60.0, track_as=None):
+        self.concurrency = max(1, int(concurrency))
+        self.limiter = TokenBucket(rpm, burst=self.concurrency) if rpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.track_as = track_as
+        self._lock = threading.Lock()
+        self._pool = None
+        self.retries = 0
+        self.failures = 0
+        # Monotonic time until which some request is backing off after a 429/5xx
+        self.backoff_until = 0.0
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call fn once under the rate limiter, retrying with exponential backoff on 429/5xx.
+        Every attempt that sends a request, including retries, consumes a rate-limit token
+        when it calls acquire_request_token; attempts answered from the cache take none.
+        """
+        attempt = 0
+        while True:
+            _attempt.limiter = self.limiter
+            try:
+                if self.track_as is None:
+                    return fn(*args, **kwargs)
+                with TELEMETRY.track(self.track_as):
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_after_of(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                    delay += random.uniform(0, delay / 2)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                    self.backoff_until = max(self.backoff_until, time.monotonic() + delay)
+                TELEMETRY.record_retry()
+                print(f"Retryable error ({type(e).__name__}), "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+            finally:
+                _attempt.limiter = None
+
+    def backoff_remaining(self):
+        """
+        Seconds until the longest current retry backoff ends (0 when the upstream is healthy).
+        """
+        return max(0.0, self.backoff_until - time.monotonic())
+
+    def _call_or_error(self, fn, item):
+        try:
+            return self.call(fn, item)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"Row failed ({type(e).__name__}): {e}")
+            return RowError(e)
+
+    def map(self, fn, items, capture_errors=False):
+        """
+        Apply fn to every item concurrently on the engine's shared pool and return the
+        results in input order.
+
+        By default the first failure is raised. With capture_errors=True a failed item
+        yields a RowError in its place, so the other items still complete.
+        """
+        items = list(items)
+        call = self._call_or_error if capture_errors else self.call
+        return list(self._executor().map(lambda item: call(fn, item), items))
+
+    def imap(self, fn, items, capture_errors=False, reorder=None):
+        """
+        Lazy counterpart of map(): items are pulled from the iterable and submitted as earlier
+        ones finish, keeping at most `concurrency` of them in flight, and the results are
+        yielded in input order as soon as they are ready.
+
+        Results that finish behind a slower earlier item wait in a reorder buffer of at most
+        `reorder` entries (default 4 * concurrency); once it is full, no new item is submitted
+        until that item completes. Errors are handled as in map().
+        """
+        call = self._call_or_error if capture_errors else self.call
+        reorder = 4 * self.concurrency if reorder is None else max(0, reorder)
+        pool = self._executor()
+        items = iter(items)
+        window = deque()
+        exhausted = False
+        while True:
+            running = sum(not future.done() for future in window)
+            while not exhausted and running < self.concurrency and len(window) < self.concurrency + reorder:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                window.append(pool.submit(call, fn, item))
+                running += 1
+            if not window:
+                return
+            if not window[0].done():
+                wait([future for future in window if not future.done()], return_when=FIRST_COMPLETED)
+                continue
+            while window and window[0].done():
+                yield window.popleft().result()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="engine")
+            return self._pool
+
+    def close(self):
+        """
+        Shut down the worker threads; a later map() starts new ones.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -1,27 +1,31 @@
+import argparse
 import os
 import pandas as pd
-from bs4 import BeautifulSoup
 
+from dataset_builder import build_dataset
+from html_extract import DATASET_MAX_LENGTH, DEFAULT_BACKEND, extract_text, extractor_id
 
-def extract_text_from_html(html_code, max_length=2000):
+# Identifies the rows built by build_html_row, recorded in the dataset manifest
+ROW_VERSION = f"{extractor_id(DEFAULT_BACKEND)}+lines{DATASET_MAX_LENGTH}"
+
+
+def extract_text_from_html(html_code, max_length=DATASET_MAX_LENGTH, backend=DEFAULT_BACKEND):
     """
-    Extracts main text content from an HTML string, truncating to max_length chars.
+    Extracts main text content from an HTML string, one text node per line, truncating to max_length chars.
+    The page is kept whole (up to max_length) so --context-tokens can pick the passages that matter;
+    the default streaming backend stops parsing once max_length chars are collected.
     """
     try:
-        soup = BeautifulSoup(html_code, "html.parser")
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        text = soup.get_text(separator=" ", strip=True)
-        return text[:max_length]
+        return extract_text(html_code, max_length, backend=backend, separator="\n")
     except Exception as e:
         print(f"Error extracting text: {e}")
         return ""
 
 
-def generate_html_content_classification_csv(html_txt_path, csv_path):
+def build_html_row(html_txt_path):
     """
-    Reads a .txt file containing raw HTML code, extracts content, and creates a CSV for LLM classification.
-    Columns: context (extracted text), question (fixed), answer (blank for manual labeling).
+    Reads a .txt file containing raw HTML code and returns its classification row.
+    Columns: context (extracted text), question (fixed), answer (label from filename).
     """
     with open(html_txt_path, "r", encoding="utf-8") as f:
         html_code = f.read()
@@ -29,12 +33,22 @@ def generate_html_content_classification_csv(html_txt_path, csv_path):
     context = extract_text_from_html(html_code)
     # Extract label from filename (expects format like html_1_yes.txt)
     label = os.path.splitext(os.path.basename(html_txt_path))[0].split('_')[-1]
-    new_row = {
+    return {
         "context": context,
         "question": "Is the following HTML page a website of a funding opportunity?",
         "answer": label  # Pre-fill with label from filename
     }
 
+
+def generate_html_content_classification_csv(html_txt_path, csv_path):
+    """
+    Reads a .txt file containing raw HTML code, extracts content, and creates a CSV for LLM classification.
+    Columns: context (extracted text), question (fixed), answer (blank for manual labeling).
+
+    Appends a single row; use build_dataset (see __main__) to build the whole CSV in one pass.
+    """
+    new_row = build_html_row(html_txt_path)
+
     # Ensure data directory exists
     data_dir = os.path.dirname(csv_path)
     os.makedirs(data_dir, exist_ok=True)
@@ -50,13 +64,13 @@ def generate_html_content_classification_csv(html_txt_path, csv_path):
     print(f"CSV file updated at: {csv_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the HTML content classification CSV from data/html.")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: one per CPU)")
+    parser.add_argument("--full", action="store_true", help="Re-parse every file instead of only changed ones")
+    args = parser.parse_args()
+
     html_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "html")
     csv_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "html_content_classification.csv")
-    html_files = [f for f in os.listdir(html_dir) if f.endswith('.txt')]
-    html_files.sort()  # Sort filenames for consistent order
-    # Remove CSV if it exists to avoid duplicate appends
-    if os.path.exists(csv_file):
-        os.remove(csv_file)
-    for html_txt_file in html_files:
-        html_txt_path = os.path.join(html_dir, html_txt_file)
-        generate_html_content_classification_csv(html_txt_path, csv_file)
+    # Parse files in parallel and write all rows, sorted by filename, in a single pass
+    build_dataset(html_dir, csv_file, ".txt", build_html_row, workers=args.workers, incremental=not args.full,
+                  version=ROW_VERSION)
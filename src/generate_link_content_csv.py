@@ -1,42 +1,72 @@
+import argparse
 import os
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
 
-def fetch_website_text(url, max_length=2000):
+from html_extract import DATASET_MAX_LENGTH, DEFAULT_BACKEND, extract_text
+from near_duplicates import NearDuplicateIndex
+from web_fetcher import HttpCache, WebFetcher
+
+def html_to_text(html_code, max_length=DATASET_MAX_LENGTH, backend=DEFAULT_BACKEND):
+    """
+    Extracts the main text content (no scripts or styles) from an HTML string, one text node
+    per line, truncating to max_length chars; --context-tokens trims it per prompt.
+    """
+    return extract_text(html_code, max_length, backend=backend, separator="\n")
+
+def fetch_website_text(url, max_length=DATASET_MAX_LENGTH, fetcher=None):
     """
     Fetches the main text content from a webpage, truncating to max_length chars.
+    If a WebFetcher is given it is used, so connections and the HTTP cache are shared.
     """
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # Remove scripts and styles
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        text = soup.get_text(separator=" ", strip=True)
-        return text[:max_length]
+        if fetcher is not None:
+            html_code = fetcher.fetch(url)
+        else:
+            resp = requests.get(url, timeout=10)
+            resp.raise_for_status()
+            html_code = resp.text
+        return html_to_text(html_code, max_length)
     except Exception as e:
         print(f"Error fetching {url}: {e}")
         return ""
 
-def generate_link_content_csv(txt_path, csv_path):
+def generate_link_content_csv(txt_path, csv_path, fetcher=None, max_length=DATASET_MAX_LENGTH, dedup_threshold=None):
     """
     Reads a .txt file with links, fetches their content, and creates a CSV for LLM classification.
     Columns: context (webpage text), question (fixed), answer (blank for manual labeling).
+    Pages are fetched concurrently through the WebFetcher (a default one if none is given).
+    With dedup_threshold, a duplicate_of column gives the row whose label an exact or near-duplicate
+    page shares (see near_duplicates.py), so only the first page of each cluster needs labeling.
+    Pages that could not be fetched (empty context) are never marked as duplicates.
     """
     with open(txt_path, "r") as f:
         links = [line.strip() for line in f if line.strip()]
 
+    fetcher = fetcher or WebFetcher(cache=HttpCache())
+    print(f"Fetching {len(links)} links ({fetcher.concurrency} concurrent, {fetcher.per_host} per host)")
+    pages = fetcher.fetch_all(links, on_error=lambda url, e: print(f"Error fetching {url}: {e}"))
+    fetcher.print_summary()
+
+    duplicates = NearDuplicateIndex(dedup_threshold) if dedup_threshold is not None else None
     data = []
-    for link in links:
-        print(f"Fetching: {link}")
-        context = fetch_website_text(link)
-        data.append({
+    for link, html_code in zip(links, pages):
+        context = html_to_text(html_code, max_length) if html_code else ""
+        row = {
             "context": context,
             "question": "Is the following link a website of a funding opportunity?",
             "answer": ""  # To be filled manually
-        })
+        }
+        if duplicates is not None:
+            row["duplicate_of"] = ""
+            # Failed fetches have no content to compare; each still needs its own label
+            if context.strip():
+                representative = duplicates.add(len(data), context, row["question"])
+                if representative != len(data):
+                    row["duplicate_of"] = representative
+        data.append(row)
+    if duplicates is not None:
+        duplicates.print_summary()
 
     # Ensure data directory exists
     data_dir = os.path.dirname(csv_path)
@@ -47,7 +77,19 @@ def generate_link_content_csv(txt_path, csv_path):
     print(f"CSV file created at: {csv_path}")
 
 if __name__ == "__main__":
-    # Example usage
+    parser = argparse.ArgumentParser(description="Fetch the pages in data/links.txt into a classification CSV.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight overall (default: 8)")
+    parser.add_argument("--per-host", type=int, default=2, help="Requests in flight per host (default: 2)")
+    parser.add_argument("--max-bytes", type=int, default=512 * 1024,
+                        help="Stop downloading a page after this many bytes (default: 524288)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the on-disk HTTP cache")
+    parser.add_argument("--dedup", type=float, metavar="THRESHOLD",
+                        help="Add a duplicate_of column for exact or near-duplicate pages "
+                             "(estimated Jaccard similarity >= THRESHOLD)")
+    args = parser.parse_args()
+
     txt_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "links.txt")
     csv_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "link_content_classification.csv")
-    generate_link_content_csv(txt_file, csv_file)
+    fetcher = WebFetcher(concurrency=args.concurrency, per_host=args.per_host, max_bytes=args.max_bytes,
+                         cache=None if args.no_cache else HttpCache())
+    generate_link_content_csv(txt_file, csv_file, fetcher=fetcher, dedup_threshold=args.dedup)
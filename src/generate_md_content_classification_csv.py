@@ -1,22 +1,40 @@
+import argparse
 import os
-import pandas as pd
 
-def generate_md_content_classification_csv(md_file_path, csv_path):
+from dataset_builder import build_dataset
+
+def md_row(md_content, source_path):
 	"""
-	Reads a .md file, extracts content, and creates/appends to a CSV for LLM classification.
+	Returns the classification row of Markdown content read or converted from source_path.
 	Columns: context (markdown), question (fixed), answer (from filename, as in the HTML script).
 	"""
-	with open(md_file_path, "r", encoding="utf-8") as f:
-		md_content = f.read()
-
-	# Extract label from filename (expects format like md_1_yes.md)
-	label = os.path.splitext(os.path.basename(md_file_path))[0].split('_')[-1]
-	new_row = {
+	# Extract label from filename (expects format like md_1_yes.md or html_1_yes.txt)
+	label = os.path.splitext(os.path.basename(source_path))[0].split('_')[-1]
+	return {
 		"context": md_content,
 		"question": "Is the following Markdown page a website of a funding opportunity?",
 		"answer": label
 	}
 
+def build_md_row(md_file_path):
+	"""
+	Reads a .md file and returns its classification row (see md_row).
+	"""
+	with open(md_file_path, "r", encoding="utf-8") as f:
+		md_content = f.read()
+	return md_row(md_content, md_file_path)
+
+def generate_md_content_classification_csv(md_file_path, csv_path):
+	"""
+	Reads a .md file, extracts content, and creates/appends to a CSV for LLM classification.
+	Columns: context (markdown), question (fixed), answer (from filename, as in the HTML script).
+
+	Appends a single row; use build_dataset (see __main__) to build the whole CSV in one pass.
+	"""
+	import pandas as pd
+
+	new_row = build_md_row(md_file_path)
+
 	# Ensure data directory exists
 	data_dir = os.path.dirname(csv_path)
 	os.makedirs(data_dir, exist_ok=True)
@@ -32,13 +50,12 @@ def generate_md_content_classification_csv(md_file_path, csv_path):
 	print(f"CSV file updated at: {csv_path}")
 
 if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Build the Markdown content classification CSV from data/md.")
+	parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: one per CPU)")
+	parser.add_argument("--full", action="store_true", help="Re-read every file instead of only changed ones")
+	args = parser.parse_args()
+
 	md_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "md")
 	csv_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "md_content_classification.csv")
-	md_files = [f for f in os.listdir(md_dir) if f.endswith('.md')]
-	md_files.sort()  # Sort filenames for consistent order
-	# Remove CSV if it exists to avoid duplicate appends
-	if os.path.exists(csv_file):
-		os.remove(csv_file)
-	for md_file in md_files:
-		md_file_path = os.path.join(md_dir, md_file)
-		generate_md_content_classification_csv(md_file_path, csv_file)
+	# Read files in parallel and write all rows, sorted by filename, in a single pass
+	build_dataset(md_dir, csv_file, ".md", build_md_row, workers=args.workers, incremental=not args.full)
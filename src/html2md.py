@@ -1,27 +1,106 @@
-import sys
+import argparse
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import html2text
 
-def html_txt_to_markdown_dir(input_dir, output_dir):
+from dataset_builder import build_dataset, file_state
+from generate_md_content_classification_csv import md_row
+
+MANIFEST_NAME = ".html2md_manifest.json"
+
+
+def convert_html_file(input_txt_path, output_md_path):
+    """
+    Convert one HTML .txt file to Markdown, writing the output atomically.
+    """
+    with open(input_txt_path, 'r', encoding='utf-8') as f:
+        html_code = f.read()
+    markdown = html2text.html2text(html_code)
+    tmp_path = output_md_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(markdown)
+    os.replace(tmp_path, output_md_path)
+    return output_md_path
+
+
+def _convert_pair(paths):
+    return convert_html_file(*paths)
+
+
+def html_txt_to_markdown_dir(input_dir, output_dir, workers=1, incremental=True):
+    """
+    Convert every .txt file in input_dir to a .md file in output_dir.
+
+    With incremental=True, files whose content hash matches the manifest from the previous
+    run (and whose output still exists) are skipped. workers > 1 converts in a process pool.
+    """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    for filename in os.listdir(input_dir):
+    manifest_file = os.path.join(output_dir, MANIFEST_NAME)
+    previous = {}
+    if incremental and os.path.exists(manifest_file):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    manifest = {}
+    jobs = []
+    for filename in sorted(os.listdir(input_dir)):
         if filename.endswith('.txt'):
             input_txt_path = os.path.join(input_dir, filename)
             base_name = os.path.splitext(filename)[0]
             output_md_path = os.path.join(output_dir, base_name + '.md')
-            with open(input_txt_path, 'r', encoding='utf-8') as f:
-                html_code = f.read()
-            markdown = html2text.html2text(html_code)
-            with open(output_md_path, 'w', encoding='utf-8') as f:
-                f.write(markdown)
+            state = file_state(input_txt_path, previous.get(filename))
+            manifest[filename] = state
+            old = previous.get(filename)
+            if old and old.get('sha256') == state['sha256'] and os.path.exists(output_md_path):
+                continue
+            jobs.append((input_txt_path, output_md_path))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            converted = pool.map(_convert_pair, jobs, chunksize=8)
+            for (input_txt_path, output_md_path), _ in zip(jobs, converted):
+                print(f"Converted {input_txt_path} to {output_md_path}")
+    else:
+        for input_txt_path, output_md_path in jobs:
+            convert_html_file(input_txt_path, output_md_path)
             print(f"Converted {input_txt_path} to {output_md_path}")
 
+    tmp_manifest = manifest_file + '.tmp'
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_manifest, manifest_file)
+    print(f"{len(jobs)} converted, {len(manifest) - len(jobs)} unchanged")
+
+
+def build_md_row_from_html(html_txt_path):
+    """
+    Convert an HTML .txt file to Markdown in memory and return its Markdown classification row
+    (same columns as generate_md_content_classification_csv).
+    """
+    with open(html_txt_path, 'r', encoding='utf-8') as f:
+        html_code = f.read()
+    return md_row(html2text.html2text(html_code), html_txt_path)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python html2md.py input_dir output_dir")
-        sys.exit(1)
-    input_dir = sys.argv[1]
-    output_dir = sys.argv[2]
-    html_txt_to_markdown_dir(input_dir, output_dir)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert HTML .txt files to Markdown.")
+    parser.add_argument("input_dir", help="Directory of HTML .txt files")
+    parser.add_argument("output_dir", nargs="?",
+                        help="Directory for the .md files (not needed with --to-csv)")
+    parser.add_argument("--workers", type=int, default=1, help="Conversion processes (default: 1)")
+    parser.add_argument("--full", action="store_true", help="Re-convert every file, ignoring the manifest")
+    parser.add_argument("--to-csv", metavar="CSV_PATH",
+                        help="Write the Markdown classification CSV directly, without intermediate .md files")
+    args = parser.parse_args()
+
+    if args.to_csv:
+        build_dataset(args.input_dir, args.to_csv, ".txt", build_md_row_from_html,
+                      workers=args.workers, incremental=not args.full)
+    elif args.output_dir:
+        html_txt_to_markdown_dir(args.input_dir, args.output_dir, workers=args.workers, incremental=not args.full)
+    else:
+        parser.error("output_dir is required unless --to-csv is given")
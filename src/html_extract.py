@@ -0,0 +1,189 @@
+"""
+Pluggable HTML visible-text extraction.
+
+All backends share the contract of the original BeautifulSoup code: drop <script>, <style>
+and <template> content, strip every text node (CDATA sections included), join the non-empty
+ones with the separator (a single space by default) and truncate to max_length characters.
+The dataset generators join with newlines and keep up to DATASET_MAX_LENGTH characters, so
+context compaction (context_compaction.py) sees the page's passages rather than a cut-off line.
+
+Backends:
+    stream      Standard-library SAX-style parser that stops as soon as max_length
+                characters of visible text have been collected (default).
+    bs4         The original BeautifulSoup "html.parser" tree (reference implementation).
+    lxml        lxml.html tree, if lxml is installed.
+    selectolax  selectolax Lexbor tree, if selectolax is installed.
+"""
+
+from html.parser import HTMLParser
+
+SKIPPED_TAGS = ("script", "style", "template")
+
+DEFAULT_BACKEND = "stream"
+
+# Text kept per page in the classification datasets; prompts are bounded by --context-tokens
+DATASET_MAX_LENGTH = 100_000
+
+# Bump whenever a backend's output changes, so dataset builds re-parse their files
+EXTRACTOR_VERSION = 2
+
+# Size of the slices fed to the streaming parser between early-stop checks
+FEED_CHUNK = 8 * 1024
+
+
+class _VisibleTextParser(HTMLParser):
+    """
+    Collects visible text nodes. Data events are buffered until the next markup event so a
+    text node split across feed() calls is still treated as one node, as in BeautifulSoup.
+    """
+
+    def __init__(self, max_length, separator=" "):
+        super().__init__(convert_charrefs=True)
+        self.max_length = max_length
+        self.separator = separator
+        self.parts = []
+        self.pending = []
+        self.length = 0
+        self.skip_depth = 0
+        self.done = False
+
+    def _flush(self):
+        if not self.pending:
+            return
+        text = "".join(self.pending).strip()
+        self.pending = []
+        if not text or self.done:
+            return
+        # Account for the separator between parts
+        self.length += len(text) + (len(self.separator) if self.parts else 0)
+        self.parts.append(text)
+        if self.max_length is not None and self.length >= self.max_length:
+            self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.pending.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> is a text node of its own; other <![...]> sections are markup
+        self._flush()
+        if data.startswith("CDATA[") and not self.skip_depth:
+            self.pending.append(data[len("CDATA["):])
+            self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_stream(html_code, max_length=2000, separator=" "):
+    parser = _VisibleTextParser(max_length, separator)
+    for start in range(0, len(html_code), FEED_CHUNK):
+        parser.feed(html_code[start:start + FEED_CHUNK])
+        if parser.done:
+            break
+    else:
+        parser.close()
+    return separator.join(parser.parts)[:max_length]
+
+
+def extract_bs4(html_code, max_length=2000, separator=" "):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_code, "html.parser")
+    for tag in soup(list(SKIPPED_TAGS)):
+        tag.decompose()
+    text = soup.get_text(separator=separator, strip=True)
+    return text[:max_length]
+
+
+def extract_lxml(html_code, max_length=2000, separator=" "):
+    import lxml.html
+    from lxml import etree
+
+    if not html_code.strip():
+        return ""
+    doc = lxml.html.document_fromstring(html_code)
+    etree.strip_elements(doc, *SKIPPED_TAGS, with_tail=False)
+    parts = []
+    length = 0
+    for node in doc.xpath("//text()"):
+        text = node.strip()
+        if not text:
+            continue
+        length += len(text) + (len(separator) if parts else 0)
+        parts.append(text)
+        if length >= max_length:
+            break
+    return separator.join(parts)[:max_length]
+
+
+def extract_selectolax(html_code, max_length=2000, separator=" "):
+    # The Lexbor backend; selectolax.parser is the deprecated Modest one, removed in selectolax 1.0
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html_code)
+    tree.strip_tags(list(SKIPPED_TAGS))
+    if tree.root is None:
+        return ""
+    return tree.root.text(separator=separator, strip=True)[:max_length]
+
+
+BACKENDS = {
+    "stream": extract_stream,
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+    "selectolax": extract_selectolax,
+}
+
+
+def extractor_id(backend=DEFAULT_BACKEND):
+    """
+    Identifier of a backend's output, recorded by dataset builds (see dataset_builder.py).
+    """
+    return f"{backend}-v{EXTRACTOR_VERSION}"
+
+
+def available_backends():
+    """
+    Names of the backends whose dependencies are importable here.
+    """
+    names = ["stream"]
+    for name, module in (("bs4", "bs4"), ("lxml", "lxml.html"), ("selectolax", "selectolax.lexbor")):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def extract_text(html_code, max_length=2000, backend=DEFAULT_BACKEND, separator=" "):
+    """
+    Extract up to max_length characters of visible text from an HTML string, joining text nodes with separator.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown extraction backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[backend](html_code, max_length, separator)
@@ -0,0 +1,227 @@
+"""
+Persistent on-disk cache for LLM responses.
+
+Entries are content-addressed by a hash of the model name, the prompt template version
+and the rendered prompt, and live in a single SQLite file. Old entries are evicted by
+age and the store is trimmed to a maximum number of entries (least recently used first),
+at startup and again every evict_every writes.
+
+Shard processes (see sharding.py) share the file, so it is opened in WAL mode, where
+readers do not block the writer, with a long busy timeout. Access times only order the
+eviction, so hits buffer them and they are written in batches rather than committed per hit.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from evaluation_engine import acquire_request_token
+
+CACHE_MODES = ("read-write", "read-only", "off")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "llm_cache.sqlite")
+
+# Seconds a connection waits for another process's write lock before "database is locked"
+BUSY_TIMEOUT = 30.0
+
+# Buffered access times written per batch
+ACCESS_FLUSH_EVERY = 256
+
+
+def cache_key(model, prompt, prompt_version=""):
+    """
+    Stable hash identifying a (model, prompt template version, rendered prompt) triple.
+    """
+    h = hashlib.sha256()
+    for part in (model, prompt_version, prompt):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache.
+
+    Args:
+        path (str): Location of the SQLite file.
+        mode (str): "read-write", "read-only" (lookups only, nothing stored) or "off".
+        max_entries (int): Entries kept after eviction, least recently used are dropped first.
+        max_age_days (float): Entries older than this are dropped.
+        evict_every (int): Writes between evictions, so a long run stays near max_entries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, mode="read-write", max_entries=100000, max_age_days=30,
+                 evict_every=1000):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode} (expected one of {', '.join(CACHE_MODES)})")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.evict_every = max(1, int(evict_every))
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        # key -> last access time of hits not yet written
+        self._accessed = {}
+        if mode != "off":
+            if mode == "read-only" and not os.path.exists(path):
+                # Nothing to read from; behave like a cache that always misses
+                return
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            if mode == "read-write":
+                # Persisted in the file; NORMAL sync is durable enough for a cache in WAL mode
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT,"
+                " response TEXT,"
+                " created REAL,"
+                " accessed REAL)"
+            )
+            self._conn.commit()
+            if mode == "read-write":
+                self.evict()
+
+    @property
+    def enabled(self):
+        return self._conn is not None
+
+    def get(self, model, prompt, prompt_version=""):
+        """
+        Return the cached response for this prompt, or None on a miss.
+        """
+        if self.mode == "off":
+            return None
+        if not self.enabled:
+            # Read-only without a cache file: every lookup is a miss
+            with self._lock:
+                self.misses += 1
+            return None
+        key = cache_key(model, prompt, prompt_version)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or time.time() - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == "read-write":
+                self._accessed[key] = time.time()
+                if len(self._accessed) >= ACCESS_FLUSH_EVERY:
+                    self._write_accessed()
+                    self._conn.commit()
+        return row[0]
+
+    def _write_accessed(self):
+        # Called with self._lock held; the caller commits
+        if self._accessed:
+            self._conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def put(self, model, prompt, response, prompt_version=""):
+        """
+        Store a response. Ignored unless the cache is in read-write mode.
+        """
+        if not self.enabled or self.mode != "read-write":
+            return
+        key = cache_key(model, prompt, prompt_version)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, str(response), now, now),
+            )
+            self._write_accessed()
+            self._conn.commit()
+            self.writes += 1
+            evict = self.writes % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then trim the store to max_entries by last access time.
+        """
+        if not self.enabled or self.mode != "read-write":
+            return
+        with self._lock:
+            # Eviction is least recently used first, so pending access times go in first
+            self._write_accessed()
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN ("
+                " SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def cached_call(self, model, prompt, fn, prompt_version=""):
+        """
+        Return the cached response for prompt, calling fn() and storing its result on a miss.
+        A miss takes the calling engine attempt's rate-limit token (see acquire_request_token).
+        """
+        response = self.get(model, prompt, prompt_version)
+        if response is not None:
+            return response
+        # Only requests that reach the provider count against the engine's rate limit
+        acquire_request_token()
+        response = fn()
+        if response is not None:
+            self.put(model, prompt, response, prompt_version)
+        return response
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def print_summary(self):
+        stats = self.summary()
+        print(f"Response cache ({stats['mode']}): {stats['hits']} hit(s), {stats['misses']} miss(es), "
+              f"{stats['writes']} write(s), hit rate {stats['hit_rate']:.2f}")
+
+    def close(self):
+        """
+        Write the buffered access times and close the connection.
+        """
+        with self._lock:
+            if self._conn is not None:
+                if self.mode == "read-write":
+                    self._write_accessed()
+                    self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+# Process-wide cache; main.py reconfigures it from the --cache option
+_cache = ResponseCache(mode="off")
+
+
+def get_cache():
+    return _cache
+
+
+def configure_cache(mode="read-write", path=DEFAULT_CACHE_PATH, **kwargs):
+    """
+    Replace the process-wide cache with one using the given mode and path.
+    """
+    global _cache
+    _cache.close()
+    _cache = ResponseCache(path=path, mode=mode, **kwargs)
+    return _cache
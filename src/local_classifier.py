@@ -0,0 +1,216 @@
+"""
+Local pre-classifier for the funding-opportunity datasets, used as the first tier of a cascade.
+
+A TF-IDF + logistic regression model is trained on the labelled
+html_content_classification and md_content_classification datasets. In cascade mode
+(main.py --cascade THRESHOLD) pages it labels with a confidence of at least THRESHOLD
+are answered locally in microseconds; only the uncertain ones are escalated to the LLM.
+
+When the model is trained inside an evaluation run, rows are split into folds by a hash
+of their page key (sharding.record_key) and every row is predicted by a model that never
+saw it (out-of-fold), so the local tier's accuracy is not inflated. The HTML and Markdown
+versions of a page share a key, so they always share a fold whatever their row positions.
+
+Usage:
+    python src/local_classifier.py                  # train on both datasets, save to data/local_classifier.joblib
+    python src/main.py --task html --cascade 0.9    # evaluate with the cascade
+"""
+
+import argparse
+import os
+import time
+from collections import Counter, defaultdict
+
+from dataset_loader import find_dataset, iter_records
+from scoring import normalize_answer
+from sharding import key_hash, record_key
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "local_classifier.joblib")
+TRAINING_DATASETS = ("html_content_classification", "md_content_classification")
+
+
+def make_pipeline():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline as sk_make_pipeline
+
+    return sk_make_pipeline(
+        TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2), max_features=50000, strip_accents="unicode"),
+        LogisticRegression(max_iter=1000, class_weight="balanced"),
+    )
+
+
+def page_group(record):
+    """
+    Fold group of a dataset row: the hash of its page key, shared by its HTML and Markdown versions.
+    """
+    return key_hash(record_key(record))
+
+
+def load_training_data(data_dir, names=TRAINING_DATASETS):
+    """
+    Read (texts, labels, groups) from every labelled dataset found; groups come from page_group.
+    """
+    texts, labels, groups = [], [], []
+    for name in names:
+        path = find_dataset(data_dir, name)
+        if path is None:
+            continue
+        for record in iter_records(path):
+            texts.append(str(record.context))
+            labels.append(normalize_answer(record.answer))
+            groups.append(page_group(record))
+    return texts, labels, groups
+
+
+class LocalClassifier:
+    """
+    Args:
+        folds (int): Number of out-of-fold models trained next to the full model (0 disables them).
+    """
+
+    def __init__(self, folds=5):
+        self.folds = folds
+        self.model = None
+        self.fold_models = {}
+
+    @staticmethod
+    def _fit_one(texts, labels):
+        # A single class cannot be learnt; those rows are always escalated
+        if len(set(labels)) < 2:
+            return None
+        return make_pipeline().fit(texts, labels)
+
+    def fit(self, texts, labels, groups=None):
+        """
+        Train the full model and, if groups are given, one model per fold of group % folds.
+        """
+        self.model = self._fit_one(texts, labels)
+        self.fold_models = {}
+        if groups is not None and self.folds > 1:
+            for fold in range(self.folds):
+                keep = [i for i, g in enumerate(groups) if g % self.folds != fold]
+                self.fold_models[fold] = self._fit_one([texts[i] for i in keep], [labels[i] for i in keep])
+        return self
+
+    def predict(self, texts, groups=None):
+        """
+        Return a (label, confidence) pair per text. With groups, each text is predicted by the
+        model of its fold, i.e. one not trained on it.
+        """
+        if groups is None or not self.fold_models:
+            return self._predict_with(self.model, texts)
+        by_fold = defaultdict(list)
+        for i, group in enumerate(groups):
+            by_fold[group % self.folds].append(i)
+        predictions = [None] * len(texts)
+        for fold, positions in by_fold.items():
+            fold_predictions = self._predict_with(self.fold_models.get(fold), [texts[i] for i in positions])
+            for i, prediction in zip(positions, fold_predictions):
+                predictions[i] = prediction
+        return predictions
+
+    @staticmethod
+    def _predict_with(model, texts):
+        if model is None:
+            return [(None, 0.0)] * len(texts)
+        probabilities = model.predict_proba([str(t) for t in texts])
+        classes = model.classes_
+        return [(classes[p.argmax()], float(p.max())) for p in probabilities]
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        import joblib
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Only the full model is needed to label new pages
+        joblib.dump(self.model, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        import joblib
+
+        classifier = cls(folds=0)
+        classifier.model = joblib.load(path)
+        return classifier
+
+
+class CascadeStats:
+    """
+    Per-tier row counts, accuracy and time for one cascade run.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.started = time.perf_counter()
+        self.rows = Counter()
+        self.correct = Counter()
+        self.seconds = defaultdict(float)
+
+    def add(self, tier, correct):
+        self.rows[tier] += 1
+        if correct:
+            self.correct[tier] += 1
+
+    def add_time(self, tier, seconds):
+        self.seconds[tier] += seconds
+
+    def summary(self, llm_cost=0.0):
+        total = sum(self.rows.values())
+        escalated = self.rows["llm"]
+        elapsed = time.perf_counter() - self.started
+        # The all-LLM path would pay the escalated rows' average time and cost for every row
+        scale = total / escalated if escalated else 0.0
+        return {
+            "rows": total,
+            "local_rows": self.rows["local"],
+            "escalated_rows": escalated,
+            "escalation_rate": escalated / total if total else 0.0,
+            "local_accuracy": self.correct["local"] / self.rows["local"] if self.rows["local"] else None,
+            "llm_accuracy": self.correct["llm"] / escalated if escalated else None,
+            "seconds": elapsed,
+            "rows_per_second": total / elapsed if elapsed else 0.0,
+            "local_seconds": self.seconds["local"],
+            "llm_seconds": self.seconds["llm"],
+            "llm_cost_usd": llm_cost,
+            "all_llm_seconds_estimate": self.seconds["llm"] * scale,
+            "all_llm_cost_usd_estimate": llm_cost * scale,
+        }
+
+    def print_summary(self, llm_cost=0.0):
+        stats = self.summary(llm_cost)
+        if not stats["rows"]:
+            return
+
+        def accuracy(value):
+            return "n/a" if value is None else f"{value:.2f}"
+
+        print(f"Cascade (threshold {self.threshold}): {stats['local_rows']} row(s) answered locally, "
+              f"{stats['escalated_rows']} escalated to the LLM (escalation rate {stats['escalation_rate']:.2f})")
+        print(f"  accuracy: local {accuracy(stats['local_accuracy'])}, LLM {accuracy(stats['llm_accuracy'])}")
+        print(f"  end-to-end: {stats['rows']} row(s) in {stats['seconds']:.2f}s = {stats['rows_per_second']:.2f} rows/s "
+              f"(local {stats['local_seconds']:.3f}s, LLM {stats['llm_seconds']:.2f}s), cost ${stats['llm_cost_usd']:.4f}")
+        if stats["escalated_rows"]:
+            print(f"  all-LLM estimate: ~{stats['all_llm_seconds_estimate']:.2f}s of LLM time, "
+                  f"cost ~${stats['all_llm_cost_usd_estimate']:.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local TF-IDF + logistic regression pre-classifier.")
+    parser.add_argument("--data-dir", default=os.getenv("CLASSIFIER_DATA_DIR",
+                                                        os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")))
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help="Model path (default: data/local_classifier.joblib)")
+    parser.add_argument("--folds", type=int, default=5, help="Folds for the cross-validated accuracy (default: 5)")
+    args = parser.parse_args()
+
+    texts, labels, groups = load_training_data(args.data_dir)
+    if not texts:
+        raise SystemExit(f"No labelled datasets found in {args.data_dir}")
+    classifier = LocalClassifier(folds=args.folds).fit(texts, labels, groups)
+    if classifier.model is None:
+        raise SystemExit("Training data has a single label; nothing to learn.")
+
+    predictions = classifier.predict(texts, groups)
+    correct = sum(1 for (label, _), reference in zip(predictions, labels) if label == reference)
+    print(f"Trained on {len(texts)} row(s); out-of-fold accuracy {correct}/{len(texts)} = {correct/len(texts):.2f}")
+    classifier.save(args.out)
+    print(f"Model saved to {args.out}")
@@ -10,243 +10,716 @@ This script demonstrates how to:
 """
 
 import os
-import pandas as pd
-from litellm import completion
 from dotenv import load_dotenv
 import argparse
+import importlib
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
 
-# DSPy integration
-import dspy
-
-
-class ClassifierModule(dspy.Module):
-    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
-        super().__init__()
-        self.model = dspy.LM(
-                    model=model_name,
-                    api_base="https://openrouter.ai/api/v1",
-                    api_key=os.getenv("OPENROUTER_API_KEY"),
-                    )
-        dspy.configure(lm=self.model)
-        self.question = dspy.InputField(desc = "User's description and question")
-        self.answer = dspy.OutputField(desc = "1 word, Yes or No without any other additions or symbols")
-        self.chain_of_thought = dspy.ChainOfThought('description_question -> one_word_answer')
-
-    def forward(self, context, question):
-        prompt = f"""
-        You are a website classification model. \n
-        Classify the following content as a funding opportunity or not using only yes or no as an answer\n
-        without any other additions even a point: {question}\n{context}\n
-        """
-        answer = self.chain_of_thought(description_question=prompt).one_word_answer
-        return dspy.Prediction(answer=answer)
-
-class MathClassifierModule(dspy.Module):
-    def __init__(self, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
-        super().__init__()
-        self.model = dspy.LM(model=model_name)
-
-    def forward(self, context, question):
-        prompt = f"{question}\n{context}\nyou are a math student,  answer only the number without any additional points or symbols."
-        response = self.model(prompt)
-        # Ensure response is string
-        if isinstance(response, list):
-            response = response[0]
-        response = str(response)
-        # Extract only yes/no
-        answer = response.strip().split()[0].lower()
-        if answer not in ["yes", "no"]:
-            answer = response.strip().lower()
-        return dspy.Prediction(answer=answer)
-
-def classify_with_dspy(context, question, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free", math=False):
-    if math:
-        module = MathClassifierModule(model_name=model_name)
-    else:
-        module = ClassifierModule(model_name=model_name)
-    pred = module(context=context, question=question)
-    return pred.answer
+# Only lightweight modules are imported here. DSPy (classifier_modules), pandas/NumPy (scoring)
+# and scikit-learn (local_classifier) are imported inside the tasks that use them, and LiteLLM
+# when the first classifier module is built, so --help and the tasks that never call a model
+# start quickly (see startup_benchmark.py)
+from evaluation_engine import EvaluationEngine, RowError
+from llm_cache import CACHE_MODES, configure_cache, get_cache
+from prompt_versions import PROMPT_VERSIONS
+from batching import THROUGHPUT, prepare_batches
+from dataset_loader import find_dataset, iter_chunks, iter_records
+from results_log import ResultsLog
+from telemetry import TELEMETRY, install_litellm_callback
+from context_compaction import ContextCompactor
+from sharding import in_shard, join_by_key, merge_shard_logs, parse_shard, shard_log_path
+from classification_service import serve
 
 # Load environment variables from .env file
 load_dotenv()
-# Set the OpenRouter API key for LiteLLM
-os.environ['OPENROUTER_API_KEY'] = os.getenv('OPENROUTER_API_KEY')
 
-def ask_openrouter(prompt, model="openrouter/mistralai/mistral-small-3.1-24b-instruct:free"):
+DEFAULT_MODEL = "openrouter/mistralai/mistral-small-3.1-24b-instruct:free"
+
+# Can be overridden from the environment, e.g. to point at a directory of synthetic datasets
+DATA_DIR = os.getenv("CLASSIFIER_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+
+# cot: chain of thought (free-text completion for math); direct: capped, typed single-step answer
+ANSWER_MODES = ("cot", "direct")
+
+class ClassifierRegistry:
     """
-    Send a prompt to the OpenRouter model using LiteLLM and return the model's response as a string.
-    Args:
-        prompt (str): The question or instruction to send to the model.
-        model (str): The OpenRouter model to use.
-    Returns:
-        str: The model's answer as a string.
+    Long-lived cache of classifier modules keyed by (model_name, task type).
+
+    Each module (and its dspy.LM client / ChainOfThought program) is built once and
+    reused for every row of a run and across calls. Setup time is tracked separately
+    from per-row inference time so the two costs can be reported independently.
     """
-    response = completion(
-        model=model,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    # Try to extract the answer as a string
-    try:
-        return response.choices[0].message.content.strip()
-    except Exception:
-        return str(response)
 
-def main_math():
+    def __init__(self, answer_mode="cot"):
+        self._modules = {}
+        self._lock = threading.Lock()
+        # Default for calls that do not pass a mode; set from --answer-mode
+        self.answer_mode = answer_mode
+        self.setup_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.builds = 0
+        self.calls = 0
+
+    def get(self, model_name, kind="classify"):
+        """
+        Return the module for model_name and task type (a MODULE_KINDS key), building it on first use.
+        """
+        key = (model_name, kind)
+        module = self._modules.get(key)
+        if module is not None:
+            return module
+        from classifier_modules import MODULE_KINDS
+
+        with self._lock:
+            module = self._modules.get(key)
+            if module is None:
+                start = time.perf_counter()
+                if not self._modules:
+                    # LiteLLM (which DSPy calls into) is loaded with the first module, so its
+                    # import is charged to setup rather than to the latency of the first calls
+                    with TELEMETRY.stage("imports"):
+                        install_litellm_callback()
+                module = MODULE_KINDS[kind](model_name=model_name)
+                self.setup_seconds += time.perf_counter() - start
+                self.builds += 1
+                self._modules[key] = module
+        return module
+
+    def kind(self, math=False, mode=None):
+        """
+        MODULE_KINDS key answering single samples in the given (or default) answer mode.
+        """
+        kind = "math" if math else "classify"
+        return f"{kind}-direct" if (mode or self.answer_mode) == "direct" else kind
+
+    def classify(self, context, question, model_name, math=False, mode=None):
+        """
+        Run one sample through the cached module and record its inference time.
+        """
+        module = self.get(model_name, self.kind(math, mode))
+        start = time.perf_counter()
+        with TELEMETRY.track(type(module).__name__):
+            pred = module(context=context, question=question)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.inference_seconds += elapsed
+            self.calls += 1
+        return pred.answer
+
+    def classify_batch(self, samples, model_name, prompt=None):
+        """
+        Classify a list of (context, question) samples with one request (prompt: pre-rendered batch prompt).
+        Returns the labels in order, or None if the model's batch answer was unusable.
+        """
+        module = self.get(model_name, "batch")
+        start = time.perf_counter()
+        with TELEMETRY.track(type(module).__name__):
+            pred = module(samples=samples, prompt=prompt)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.inference_seconds += elapsed
+            self.calls += 1
+        return pred.answers
+
+    def summary(self):
+        """
+        Return setup and inference timings as a dict.
+        """
+        return {
+            "modules_built": self.builds,
+            "setup_seconds": self.setup_seconds,
+            "inference_calls": self.calls,
+            "inference_seconds": self.inference_seconds,
+            "mean_inference_seconds": self.inference_seconds / self.calls if self.calls else 0.0,
+        }
+
+    def print_summary(self):
+        stats = self.summary()
+        print(f"Classifier setup: {stats['modules_built']} module(s) in {stats['setup_seconds']:.2f}s")
+        print(f"Inference: {stats['inference_calls']} call(s) in {stats['inference_seconds']:.2f}s "
+              f"(mean {stats['mean_inference_seconds']:.2f}s/row)")
+
+
+# Process-wide registry shared by every task
+CLASSIFIER_REGISTRY = ClassifierRegistry()
+
+
+def classify_with_dspy(context, question, model_name="openrouter/mistralai/mistral-small-3.1-24b-instruct:free", math=False,
+                       mode=None):
+    return CLASSIFIER_REGISTRY.classify(context, question, model_name, math=math, mode=mode)
+
+
+def classify_samples(samples, engine, batch_size=1, token_budget=6000, model_name=DEFAULT_MODEL, batches=None,
+                     mode=None):
     """
-    Main function to load math questions, answer them with OpenRouter, and compare to reference answers.
+    Classify (context, question) samples through the evaluation engine and return the answers in order.
+
+    With batch_size > 1, samples are packed into batches of up to batch_size items (and at most
+    token_budget estimated prompt tokens) that are each answered by a single request. Batches
+    whose answer is malformed or short are re-run one row at a time. batches can pass the
+    output of prepare_batches for these samples to reuse packed and rendered prompts. mode
+    selects the answer mode of single-row requests (default: the registry's). A row whose
+    request fails for good gets a RowError in place of its answer (see answer_fields).
     """
-    # Path to the provided math questions CSV
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-    csv_path = os.path.join(data_dir, "math_addition_questions.csv")
-    if not os.path.exists(csv_path):
-        print(f"CSV file not found: {csv_path}")
-        return
+    if batch_size <= 1:
+        answers = engine.map(lambda s: classify_with_dspy(s[0], s[1], model_name=model_name, mode=mode), samples,
+                             capture_errors=True)
+        THROUGHPUT.add_labels(len(answers))
+        return answers
 
-    # Load questions from CSV into a DataFrame
-    df = pd.read_csv(csv_path)
-    print(f"Loaded {len(df)} math questions.")
+    if batches is None:
+        batches = prepare_batches(samples, batch_size, token_budget)
+    batch_answers = engine.map(
+        lambda item: CLASSIFIER_REGISTRY.classify_batch([sample for _, sample in item[0]], model_name, prompt=item[1]),
+        batches, capture_errors=True)
 
-    correct = 0  # Counter for correct answers
-    total = 0    # Counter for total questions
+    answers = [None] * len(samples)
+    retry = []
+    for (batch, _), labels in zip(batches, batch_answers):
+        if labels is None or isinstance(labels, RowError):
+            THROUGHPUT.add_fallback()
+            retry.extend(batch)
+            continue
+        for (idx, _), label in zip(batch, labels):
+            answers[idx] = label
+    if retry:
+        retried = engine.map(
+            lambda item: classify_with_dspy(item[1][0], item[1][1], model_name=model_name, mode=mode), retry,
+            capture_errors=True)
+        for (idx, _), answer in zip(retry, retried):
+            answers[idx] = answer
+    THROUGHPUT.add_labels(len(answers))
+    return answers
 
 
-    # Iterate over each question in the dataset using DSPy
-    for idx, row in df.iterrows():
-        context = ""  # No context for math, just the question
-        question = row['question']
-        reference = str(row['answer']).strip()
-        # Use DSPy for classification
-        answer = classify_with_dspy(context, question, math=True)
-        is_correct = (str(answer).replace('.', '').replace('*', '') == str(reference).replace('.', '').replace('*', ''))
-        print(f"Q: {question}\nDSPy Answer: {answer}\nReference: {reference}\nCorrect: {is_correct}\n---")
-        total += 1
-        if is_correct:
-            correct += 1
+def classify_stream(rows, engine, batch_size=1, token_budget=6000, model_name=DEFAULT_MODEL):
+    """
+    Classify a stream of (row, samples) pairs through a rolling window of engine requests and
+    yield (row, answers) in input order, with one answer (or RowError) per sample of the row.
 
-        if total >= 10: # Limit to 10 questions for free models bottleneck
-            break
+    Unlike fixed waves, a new request is sent as soon as any in-flight one finishes, so a
+    request backing off after a 429 only holds back the rows queued behind it in the engine's
+    reorder buffer (see EvaluationEngine.imap), not the other workers. Rows are pulled a block
+    of wave_size rows at a time as the window needs them; with batch_size > 1, the samples of
+    a block are packed as in classify_samples and malformed batches are re-run one row at a time.
+    """
+    # Requests in the order they were submitted, i.e. the order imap yields their results
+    submitted = deque()
 
-    # Print the overall accuracy
-    print(f"Accuracy: {correct}/{total} = {correct/total:.2f}")
-    
-def main_md():
+    def requests():
+        for block in iter_chunks(rows, wave_size(engine, batch_size)):
+            samples = [sample for _, row_samples in block for sample in row_samples]
+            if batch_size > 1:
+                packed = [([sample for _, sample in batch], prompt)
+                          for batch, prompt in prepare_batches(samples, batch_size, token_budget)]
+            else:
+                packed = [([sample], None) for sample in samples]
+            ends = list(accumulate(len(row_samples) for _, row_samples in block))
+            # Every request completes the rows whose last sample it answers (and the rows without samples before them)
+            pos = sent = 0
+            for request in packed + [None]:
+                sent += len(request[0]) if request is not None else 0
+                first = pos
+                while pos < len(block) and ends[pos] <= sent:
+                    pos += 1
+                if request is not None or pos > first:
+                    submitted.append(([(row, len(row_samples)) for row, row_samples in block[first:pos]], request))
+                    yield request
+
+    def send(request):
+        if request is None:
+            return None
+        request_samples, prompt = request
+        if prompt is None:
+            return classify_with_dspy(request_samples[0][0], request_samples[0][1], model_name=model_name)
+        return CLASSIFIER_REGISTRY.classify_batch(request_samples, model_name, prompt=prompt)
+
+    answers = deque()
+    for result in engine.imap(send, requests(), capture_errors=True):
+        done, request = submitted.popleft()
+        if request is not None:
+            request_samples, prompt = request
+            if prompt is None:
+                results = [result]
+            elif result is None or isinstance(result, RowError):
+                THROUGHPUT.add_fallback()
+                results = engine.map(lambda s: classify_with_dspy(s[0], s[1], model_name=model_name),
+                                     request_samples, capture_errors=True)
+            else:
+                results = result
+            THROUGHPUT.add_labels(len(results))
+            answers.extend(results)
+        for row, count in done:
+            yield row, [answers.popleft() for _ in range(count)]
+
+
+def answer_fields(answer):
     """
-    Main function to load Markdown content, answer with OpenRouter, and compare to reference answers.
+    Log fields of a row's answer: a RowError is logged as answer None with its error, so
+    ResultsLog.completed does not count the row and a resumed run retries it.
+    """
+    if isinstance(answer, RowError):
+        return {"answer": None, "error": str(answer)}
+    return {"answer": answer}
+
+
+def prompt_version_for(batch_size, context_tokens=0, cascade=None, mode=None, math=False, dedup=None):
+    """
+    Prompt template version that produced the answers for this batch size (and answer mode,
+    context compaction budget, cascade threshold and dedup threshold), recorded in result logs.
+    """
+    if batch_size > 1 and not math:
+        version = PROMPT_VERSIONS["batch"]
+    else:
+        version = PROMPT_VERSIONS[CLASSIFIER_REGISTRY.kind(math, mode)]
+    if context_tokens:
+        version += f"+ctx{context_tokens}"
+    if cascade is not None:
+        version += f"+cascade{cascade}"
+    if dedup is not None:
+        version += f"+dedup{dedup}"
+    return version
+
+
+def build_compactor(csv_path, context_tokens, model_name, offset=0, limit=None):
+    """
+    Return a ContextCompactor fitted on the selected rows of csv_path, or None if compaction is off.
+    """
+    if not context_tokens:
+        return None
+    compactor = ContextCompactor(context_tokens, model_name=model_name)
+    with TELEMETRY.stage("context_compaction"):
+        compactor.fit(r.context for r in iter_records(csv_path, offset=offset, limit=limit))
+    return compactor
+
+
+def compact_context(compactor, context, question):
+    if compactor is None:
+        return context
+    with TELEMETRY.stage("context_compaction"):
+        return compactor.compact(context, question)
+
+
+def build_local_classifier(cascade_model=None):
+    """
+    Load the cascade's local tier from cascade_model, or train it (with out-of-fold models)
+    on the labelled datasets in DATA_DIR.
+    """
+    from local_classifier import LocalClassifier, load_training_data
+
+    with TELEMETRY.stage("cascade_train"):
+        if cascade_model:
+            print(f"Loading local classifier from {cascade_model}")
+            return LocalClassifier.load(cascade_model)
+        texts, labels, groups = load_training_data(DATA_DIR)
+        print(f"Training local classifier on {len(texts)} labelled row(s)")
+        return LocalClassifier().fit(texts, labels, groups)
+
+
+def llm_cost():
+    """
+    Total provider cost recorded by telemetry for this run.
+    """
+    return sum(c["cost_usd"] for name, c in TELEMETRY.snapshot()["calls"].items() if name.endswith(".llm"))
+
+
+def wave_size(engine, batch_size=1):
     """
-    # Path to the provided Markdown content CSV
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-    csv_path = os.path.join(data_dir, "md_content_classification.csv")
-    if not os.path.exists(csv_path):
-        print(f"CSV file not found: {csv_path}")
+    Rows that fit in one wave of concurrent requests: the read-ahead block of classify_stream
+    and the service's micro-batch size.
+    """
+    return engine.concurrency * max(1, batch_size)
+
+
+def print_run_summary():
+    """
+    Print classifier timings and response cache counters for the run.
+    """
+    CLASSIFIER_REGISTRY.print_summary()
+    get_cache().print_summary()
+    TELEMETRY.print_summary()
+
+def main_math(engine=None, offset=0, limit=10, chunk_rows=200, model_name=DEFAULT_MODEL):
+    """
+    Main function to load math questions, answer them with OpenRouter, and compare to reference answers.
+    """
+    from scoring import normalize_answer
+
+    engine = engine or EvaluationEngine()
+    # Path to the provided math questions dataset
+    data_dir = DATA_DIR
+    csv_path = find_dataset(data_dir, "math_addition_questions")
+    if csv_path is None:
+        print(f"Dataset not found: {os.path.join(data_dir, 'math_addition_questions.csv')}")
         return
 
-    # Load questions from CSV into a DataFrame
-    df = pd.read_csv(csv_path)
-    print(f"Loaded {len(df)} Markdown content samples.")
+    # Stream questions from the dataset; limit defaults to 10 for free models bottleneck
+    print(f"Streaming math questions from {csv_path}")
+    records = TELEMETRY.timed_iter("dataset_load", iter_records(csv_path, offset=offset, limit=limit))
 
     correct = 0  # Counter for correct answers
     total = 0    # Counter for total questions
+    failed = 0   # Questions whose request failed; not scored
 
-    # Iterate over each question in the dataset using DSPy
-    for idx, row in df.iterrows():
-        context = row['context']
-        question = row['question']
-        reference = str(row['answer']).strip()
-        answer = classify_with_dspy(context, question)
-        is_correct = (str(answer).strip().lower().replace('.', '').replace('*', '') == str(reference).strip().lower().replace('.', '').replace('*', ''))
-        print(f"Q: {question}\nDSPy Answer: {answer}\nReference: {reference}\nCorrect: {is_correct}\n---")
-        total += 1
-        if is_correct:
-            correct += 1
+    # Answer each chunk of questions concurrently using DSPy, results come back in row order
+    for chunk in iter_chunks(records, chunk_rows):
+        answers = engine.map(lambda r: classify_with_dspy("", r.question, model_name=model_name, math=True), chunk,
+                             capture_errors=True)
+        for record, answer in zip(chunk, answers):
+            question = record.question
+            reference = str(record.answer).strip()
+            if isinstance(answer, RowError):
+                print(f"Q: {question}\nFailed: {answer}\n---")
+                failed += 1
+                continue
+            is_correct = normalize_answer(answer) == normalize_answer(reference)
+            print(f"Q: {question}\nDSPy Answer: {answer}\nReference: {reference}\nCorrect: {is_correct}\n---")
+            total += 1
+            if is_correct:
+                correct += 1
+
+    if failed:
+        print(f"{failed} question(s) failed and are not scored")
+    if not total:
+        print("No questions in the selected range.")
+        return
 
+    # Print the overall accuracy
     print(f"Accuracy: {correct}/{total} = {correct/total:.2f}")
+    print_run_summary()
+
 
-def main_html():
+def evaluate_classification_dataset(name, description, engine=None, batch_size=1, token_budget=6000,
+                                    offset=0, limit=None, resume=False, context_tokens=0,
+                                    cascade=None, cascade_model=None, model_name=DEFAULT_MODEL, dedup=None,
+                                    shard=None):
     """
-    Main function to load HTML content, answer with OpenRouter, and compare to reference answers.
+    Stream a classification dataset (context, question, answer), classify it with OpenRouter
+    and compare to the reference answers. Shared by the html and md tasks.
+
+    Each scored row is appended to data/<name>_results.jsonl as soon as it completes; with
+    resume=True, rows already logged for the same model and prompt version are skipped and
+    the accuracy is computed from the log. context_tokens > 0 compacts every context to that
+    many tokens (see context_compaction.py).
+
+    With cascade set to a confidence threshold, a local TF-IDF model (see local_classifier.py)
+    answers the rows it is at least that confident about and only the rest go to the LLM.
+    Without cascade_model, each row is labelled by a local model that was not trained on it.
+
+    With dedup set to a similarity threshold, exact and near-duplicate pages (see near_duplicates.py)
+    are classified once: each row copies the answer of the earliest row of its cluster.
+
+    With shard=(i, N), only the rows of shard i (see sharding.py) are evaluated and logged to
+    the shard's own results log; --task merge combines the shards.
     """
-    # Path to the provided HTML content CSV
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-    csv_path = os.path.join(data_dir, "html_content_classification.csv")
-    if not os.path.exists(csv_path):
-        print(f"CSV file not found: {csv_path}")
+    from local_classifier import CascadeStats, page_group
+    from near_duplicates import NearDuplicateIndex
+    from scoring import answers_match, normalize_answer, print_classification_report
+
+    engine = engine or EvaluationEngine()
+    THROUGHPUT.reset()
+    data_dir = DATA_DIR
+    csv_path = find_dataset(data_dir, name)
+    if csv_path is None:
+        print(f"Dataset not found: {os.path.join(data_dir, name + '.csv')}")
         return
 
-    # Load questions from CSV into a DataFrame
-    df = pd.read_csv(csv_path)
-    print(f"Loaded {len(df)} HTML content samples.")
+    print(f"Streaming {description} samples from {csv_path}" + (f" (shard {shard[0]}/{shard[1]})" if shard else ""))
+    records = TELEMETRY.timed_iter("dataset_load", (r for r in iter_records(csv_path, offset=offset, limit=limit)
+                                                    if in_shard(r, shard)))
 
-    correct = 0  # Counter for correct answers
-    total = 0    # Counter for total questions
+    compactor = build_compactor(csv_path, context_tokens, model_name, offset=offset, limit=limit)
+    local = build_local_classifier(cascade_model) if cascade is not None else None
+    cascade_stats = CascadeStats(cascade) if local is not None else None
+    duplicates = NearDuplicateIndex(dedup) if dedup is not None else None
+    # Answer (and tier) of every cluster representative classified so far
+    cluster_answers = {}
+    llm_rows_saved = 0
+
+    log = ResultsLog(shard_log_path(os.path.join(data_dir, f"{name}_results.jsonl"), shard))
+    prompt_version = prompt_version_for(batch_size, context_tokens, cascade, dedup=dedup)
+    if resume:
+        done = log.completed(model_name, prompt_version)
+        print(f"Resuming: {len(done)} row(s) already recorded for {model_name} ({prompt_version})")
+        records = (r for r in records if r.index not in done)
 
-    # Iterate over each question in the dataset using DSPy
-    for idx, row in df.iterrows():
-        context = row['context']
-        question = row['question']
-        reference = str(row['answer']).strip()
-        answer = classify_with_dspy(context, question)
-        is_correct = (str(answer).strip().lower().replace('.', '').replace('*', '') == str(reference).strip().lower().replace('.', '').replace('*', ''))
+    # Representatives whose page is classified by a row of this run. A failed one is released:
+    # copies read after the failure classify the page again, earlier ones copy the error
+    claimed = set()
+
+    def prepared():
+        # Dedup and the local tier work on blocks of rows; escalated rows carry their LLM sample
+        for chunk in iter_chunks(records, wave_size(engine, batch_size)):
+            tiers = ["llm"] * len(chunk)
+            answers = [None] * len(chunk)
+            confidences = [None] * len(chunk)
+            representatives = [r.index for r in chunk]
+            pending = set(range(len(chunk)))
+            if duplicates is not None:
+                with TELEMETRY.stage("dedup"):
+                    for i, record in enumerate(chunk):
+                        rep = representatives[i] = duplicates.add(record.index, record.context, record.question or "")
+                        if rep in claimed:
+                            pending.discard(i)
+                            tiers[i] = "duplicate"
+                        else:
+                            claimed.add(rep)
+
+            if local is not None:
+                start = time.perf_counter()
+                # The local tier sees the full page; only escalated rows are compacted
+                rows = sorted(pending)
+                groups = None if cascade_model else [page_group(chunk[i]) for i in rows]
+                for i, (label, confidence) in zip(rows, local.predict([chunk[i].context for i in rows], groups)):
+                    confidences[i] = round(confidence, 4)
+                    if label is not None and confidence >= cascade:
+                        answers[i] = label
+                        tiers[i] = "local"
+                cascade_stats.add_time("local", time.perf_counter() - start)
+
+            for i, record in enumerate(chunk):
+                samples = []
+                if tiers[i] == "llm":
+                    samples.append((compact_context(compactor, record.context, record.question), record.question))
+                yield (record, tiers[i], answers[i], confidences[i], representatives[i]), samples
+
+    # Rows stream through a rolling window of requests (optionally several rows per request)
+    # and are logged in row order as soon as they and every earlier row are answered
+    indices = set()
+    escalated = 0
+    start = time.perf_counter()
+    stream = classify_stream(prepared(), engine, batch_size=batch_size, token_budget=token_budget,
+                             model_name=model_name)
+    for (record, tier, answer, confidence, rep), llm_answers in stream:
+        if tier == "llm":
+            answer = llm_answers[0]
+            escalated += 1
+        if duplicates is not None:
+            if tier == "duplicate":
+                # The row that classified this page came earlier, so its answer is already known
+                answer, source_tier = cluster_answers[rep]
+                if source_tier == "llm":
+                    llm_rows_saved += 1
+            else:
+                cluster_answers[rep] = (answer, tier)
+                if isinstance(answer, RowError):
+                    claimed.discard(rep)
+
+        question = record.question
+        reference = str(record.answer).strip()
+        failed = isinstance(answer, RowError)
+        is_correct = not failed and normalize_answer(answer) == normalize_answer(reference)
         print(f"Q: {question}\nDSPy Answer: {answer}\nReference: {reference}\nCorrect: {is_correct}\n---")
-        total += 1
-        if is_correct:
-            correct += 1
+        entry = {
+            "index": record.index,
+            "model": model_name,
+            "prompt_version": prompt_version,
+            "reference": reference,
+            **answer_fields(answer),
+            "correct": is_correct,
+        }
+        if cascade_stats is not None and tier != "duplicate" and not failed:
+            cascade_stats.add(tier, is_correct)
+            entry.update(tier=tier, local_confidence=confidence)
+        if rep != record.index:
+            entry["duplicate_of"] = rep
+        with TELEMETRY.stage("results_log"):
+            log.append(entry)
+        indices.add(record.index)
+    if cascade_stats is not None and escalated:
+        # Requests overlap the local tier, so the LLM tier is charged the rest of the streaming time
+        cascade_stats.add_time("llm", time.perf_counter() - start - cascade_stats.seconds["local"])
+
+    # Accuracy comes from the log so rows completed by earlier (resumed) runs are included
+    with TELEMETRY.stage("results_log"):
+        results = log.latest(model_name, prompt_version)
+    if not resume:
+        results = {idx: r for idx, r in results.items() if idx in indices}
+    failed = sum("error" in r for r in results.values())
+    if failed:
+        print(f"{failed} row(s) failed and are not scored; rerun with --resume to retry them")
+        results = {idx: r for idx, r in results.items() if "error" not in r}
+    total = len(results)
+    if not total:
+        print("No samples in the selected range.")
+        return
+    # Rescore from the logged answers, so every row uses the current normalization rules
+    references = [r["reference"] for r in results.values()]
+    answers = [r["answer"] for r in results.values()]
+    correct = int(answers_match(answers, references).sum())
 
     print(f"Accuracy: {correct}/{total} = {correct/total:.2f}")
+    print_classification_report(references, answers)
+    print(f"Per-row results logged to {log.path}")
+    print_run_summary()
+    if compactor is not None:
+        compactor.print_summary()
+    if cascade_stats is not None:
+        cascade_stats.print_summary(llm_cost())
+    if duplicates is not None:
+        duplicates.print_summary(llm_rows_saved=llm_rows_saved, batch_size=batch_size)
+    THROUGHPUT.print_summary(batch_size)
+
+def main_md(engine=None, batch_size=1, token_budget=6000, offset=0, limit=None, resume=False, context_tokens=0,
+            cascade=None, cascade_model=None, model_name=DEFAULT_MODEL, dedup=None, shard=None):
+    """
+    Main function to load Markdown content, answer with OpenRouter, and compare to reference answers.
+    """
+    evaluate_classification_dataset("md_content_classification", "Markdown content", engine,
+                                    batch_size=batch_size, token_budget=token_budget, offset=offset, limit=limit,
+                                    resume=resume, context_tokens=context_tokens, cascade=cascade,
+                                    cascade_model=cascade_model, model_name=model_name, dedup=dedup,
+                                    shard=shard)
+
+def main_html(engine=None, batch_size=1, token_budget=6000, offset=0, limit=None, resume=False, context_tokens=0,
+              cascade=None, cascade_model=None, model_name=DEFAULT_MODEL, dedup=None, shard=None):
+    """
+    Main function to load HTML content, answer with OpenRouter, and compare to reference answers.
+    """
+    evaluate_classification_dataset("html_content_classification", "HTML content", engine,
+                                    batch_size=batch_size, token_budget=token_budget, offset=offset, limit=limit,
+                                    resume=resume, context_tokens=context_tokens, cascade=cascade,
+                                    cascade_model=cascade_model, model_name=model_name, dedup=dedup,
+                                    shard=shard)
     
     
-def benchmark_html_vs_md():
+def benchmark_html_vs_md(engine=None, batch_size=1, token_budget=6000, offset=0, limit=None, resume=False,
+                         context_tokens=0, model_name=DEFAULT_MODEL, shard=None):
         """
         Compare LLM outputs for HTML and Markdown content, log differences to a CSV.
+
+        Each compared sample is appended to data/benchmark_html_vs_md.jsonl as soon as it is
+        scored; with resume=True samples already logged for the same model and prompt version
+        are skipped. The CSV and summary are then built from the log by summarize_benchmark.
+        HTML and Markdown rows are paired by the stable key of their source file (see
+        sharding.py), so with shard=(i, N) both versions of a page are in the same shard.
         """
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-        html_csv = os.path.join(data_dir, "html_content_classification.csv")
-        md_csv = os.path.join(data_dir, "md_content_classification.csv")
-        log_csv = os.path.join(data_dir, "benchmark_html_vs_md.csv")
+        from scoring import normalize_answer
+
+        engine = engine or EvaluationEngine()
+        THROUGHPUT.reset()
+        data_dir = DATA_DIR
+        html_csv = find_dataset(data_dir, "html_content_classification")
+        md_csv = find_dataset(data_dir, "md_content_classification")
 
-        if not os.path.exists(html_csv) or not os.path.exists(md_csv):
+        if html_csv is None or md_csv is None:
             print("Both html_content_classification.csv and md_content_classification.csv must exist.")
             return
 
-        df_html = pd.read_csv(html_csv)
-        df_md = pd.read_csv(md_csv)
-
-        # Try to align by row index (assumes same order and length)
-        min_len = min(len(df_html), len(df_md))
-        results = []
-        for idx in range(min_len):
-            html_row = df_html.iloc[idx]
-            md_row = df_md.iloc[idx]
-            html_context = html_row['context']
-            html_question = html_row['question']
-            md_context = md_row['context']
-            md_question = md_row['question']
-            reference = str(html_row['answer']).strip()
-
-            # Use DSPy ClassifierModule for both HTML and MD
-            html_answer = classify_with_dspy(html_context, html_question)
-            md_answer = classify_with_dspy(md_context, md_question)
-            html_answer_clean = str(html_answer).strip().lower().replace('.', '')
-            md_answer_clean = str(md_answer).strip().lower().replace('.', '')
-            reference_clean = reference.lower().replace('.', '')
+        # HTML and Markdown pages have different boilerplate, so each gets its own compactor
+        html_compactor = build_compactor(html_csv, context_tokens, model_name, offset=offset, limit=limit)
+        md_compactor = build_compactor(md_csv, context_tokens, model_name, offset=offset, limit=limit)
+
+        log = ResultsLog(shard_log_path(os.path.join(data_dir, "benchmark_html_vs_md.jsonl"), shard))
+        prompt_version = prompt_version_for(batch_size, context_tokens)
+
+        # Stream both datasets side by side, paired by source file (by row position for
+        # datasets without a source column); unpaired rows are skipped
+        html_rows = (r for r in iter_records(html_csv, offset=offset, limit=limit) if in_shard(r, shard))
+        md_rows = (r for r in iter_records(md_csv, offset=offset, limit=limit) if in_shard(r, shard))
+        pairs = TELEMETRY.timed_iter("dataset_load", join_by_key(html_rows, md_rows))
+        if resume:
+            done = log.completed(model_name, prompt_version)
+            print(f"Resuming: {len(done)} sample(s) already recorded for {model_name} ({prompt_version})")
+            pairs = (p for p in pairs if p[0].index not in done)
+
+        # Two requests (HTML and MD) per sample; samples are logged in order as soon as both are answered
+        def prepared():
+            for html_row, md_row in pairs:
+                yield (html_row, md_row), [
+                    (compact_context(html_compactor, html_row.context, html_row.question), html_row.question),
+                    (compact_context(md_compactor, md_row.context, md_row.question), md_row.question),
+                ]
+
+        # Use DSPy ClassifierModule for both HTML and MD; the engine's rate limiter
+        # replaces the fixed per-sample sleep
+        for (html_row, md_row), (html_answer, md_answer) in classify_stream(
+                prepared(), engine, batch_size=batch_size, token_budget=token_budget, model_name=model_name):
+            idx = html_row.index
+            reference = str(html_row.answer).strip()
+            errors = [f"{label}: {answer}" for label, answer in (("html", html_answer), ("md", md_answer))
+                      if isinstance(answer, RowError)]
+            if errors:
+                # Logged without answers, so a resumed run retries the pair
+                with TELEMETRY.stage("results_log"):
+                    log.append({
+                        "index": idx,
+                        "model": model_name,
+                        "prompt_version": prompt_version,
+                        "reference": reference,
+                        "html_answer": None,
+                        "md_answer": None,
+                        "error": "; ".join(errors),
+                    })
+                print(f"Sample {idx}: failed ({'; '.join(errors)})")
+                continue
+            html_answer_clean = normalize_answer(html_answer)
+            md_answer_clean = normalize_answer(md_answer)
+            reference_clean = normalize_answer(reference)
             match = html_answer_clean == md_answer_clean
             html_correct = html_answer_clean == reference_clean
             md_correct = md_answer_clean == reference_clean
-            results.append({
-                "index": idx,
-                "reference": reference,
-                "html_answer": html_answer,
-                "md_answer": md_answer,
-                "answers_match": match,
-                "html_correct": html_correct,
-                "md_correct": md_correct
-            })
+            with TELEMETRY.stage("results_log"):
+                log.append({
+                    "index": idx,
+                    "model": model_name,
+                    "prompt_version": prompt_version,
+                    "reference": reference,
+                    "html_answer": html_answer,
+                    "md_answer": md_answer,
+                    "answers_match": match,
+                    "html_correct": html_correct,
+                    "md_correct": md_correct
+                })
             print(f"Sample {idx}: HTML='{html_answer}' | MD='{md_answer}' | Match={match} | Ref={reference}")
-            time.sleep(5)
-        df_results = pd.DataFrame(results)
-        df_results.to_csv(log_csv, index=False)
-        html_total = len(df_results)
-        html_correct = df_results['html_correct'].sum()
-        md_correct = df_results['md_correct'].sum()
+
+        summarize_benchmark(model_name=model_name, prompt_version=prompt_version, log_path=log.path)
+        print_run_summary()
+        for label, compactor in (("HTML", html_compactor), ("MD", md_compactor)):
+            if compactor is not None:
+                print(f"{label} ", end="")
+                compactor.print_summary()
+        THROUGHPUT.print_summary(batch_size)
+
+
+def summarize_benchmark(model_name=DEFAULT_MODEL, prompt_version=None, log_path=None):
+        """
+        Build benchmark_html_vs_md.csv and print the HTML vs Markdown summary from the results log
+        (or from log_path, e.g. a shard or merged log, next to which the CSV is written).
+        No LLM calls are made, so this can be rerun after changing the scoring or reporting.
+        """
+        import pandas as pd
+        from scoring import (answers_match, drop_failed, load_results, print_classification_report,
+                             print_paired_report)
+
+        data_dir = DATA_DIR
+        log = ResultsLog(log_path or os.path.join(data_dir, "benchmark_html_vs_md.jsonl"))
+        log_csv = os.path.splitext(log.path)[0] + ".csv"
+        prompt_version = prompt_version or prompt_version_for(1)
+
+        with TELEMETRY.stage("results_log"):
+            latest = load_results(log.path, model_name, prompt_version) if os.path.exists(log.path) else pd.DataFrame()
+        latest, failed = drop_failed(latest)
+        if failed:
+            print(f"{failed} sample(s) failed and are not scored; rerun with --resume to retry them")
+        if latest.empty:
+            print(f"No benchmark results logged for {model_name} ({prompt_version}) in {log.path}")
+            return
+        columns = ["index", "reference", "html_answer", "md_answer", "answers_match", "html_correct", "md_correct"]
+        results = latest.reindex(columns=columns)
+        # Rescore the whole log column-wise with the shared normalization rules
+        with TELEMETRY.stage("scoring"):
+            results["answers_match"] = answers_match(results["html_answer"], results["md_answer"])
+            results["html_correct"] = answers_match(results["html_answer"], results["reference"])
+            results["md_correct"] = answers_match(results["md_answer"], results["reference"])
+
+        html_total = len(results)
+        html_correct = int(results["html_correct"].sum())
+        md_correct = int(results["md_correct"].sum())
         html_acc = html_correct / html_total if html_total else 0
         md_acc = md_correct / html_total if html_total else 0
         print(f"\nHTML correct: {html_correct}/{html_total} = {html_acc:.2f}")
@@ -267,10 +740,278 @@ def benchmark_html_vs_md():
             'html_correct': html_correct,
             'md_correct': md_correct
         }
-        df_results = pd.concat([df_results, pd.DataFrame([summary_row])], ignore_index=True)
-        df_results.to_csv(log_csv, index=False)
+        with TELEMETRY.stage("scoring"):
+            for column, label in (("html_answer", "HTML"), ("md_answer", "MD")):
+                print_classification_report(results["reference"], results[column], title=label)
+            print_paired_report(results["reference"], results["html_answer"], results["md_answer"])
+        with TELEMETRY.stage("csv_write"):
+            pd.concat([results, pd.DataFrame([summary_row], columns=columns)], ignore_index=True).to_csv(
+                log_csv, index=False)
         print(f"Benchmark results saved to {log_csv}")
     
+def merge_results():
+    """
+    Merge the shard results logs of the html, md and benchmark tasks (see sharding.py) into one
+    sorted log per dataset and print the summary of every model and prompt version in it.
+    """
+    from scoring import answers_match, drop_failed, load_results, print_classification_report
+
+    merged_any = False
+    for name in ("html_content_classification_results", "md_content_classification_results", "benchmark_html_vs_md"):
+        merged = merge_shard_logs(os.path.join(DATA_DIR, name + ".jsonl"))
+        if merged is None:
+            continue
+        merged_any = True
+        out_path, rows, count, missing = merged
+        print(f"\nMerged {count} shard(s) of {name}: {rows} record(s) written to {out_path}")
+        if missing:
+            print(f"  Missing shard(s): {', '.join(f'{i}/{count}' for i in missing)}; the summary is partial")
+        results = load_results(out_path)
+        for (model, prompt_version), group in results.groupby(["model", "prompt_version"], sort=True):
+            print(f"\n{model} ({prompt_version})")
+            if name == "benchmark_html_vs_md":
+                summarize_benchmark(model_name=model, prompt_version=prompt_version, log_path=out_path)
+                continue
+            group, failed = drop_failed(group)
+            if failed:
+                print(f"{failed} row(s) failed and are not scored; rerun the shard with --resume to retry them")
+            if group.empty:
+                continue
+            correct = int(answers_match(group["answer"], group["reference"]).sum())
+            print(f"Accuracy: {correct}/{len(group)} = {correct/len(group):.2f}")
+            print_classification_report(group["reference"], group["answer"])
+    if not merged_any:
+        print(f"No shard results logs found in {DATA_DIR}")
+
+
+# Sweep dataset key -> (dataset name, answered by the math module)
+SWEEP_DATASETS = {
+    "math": ("math_addition_questions", True),
+    "html": ("html_content_classification", False),
+    "md": ("md_content_classification", False),
+}
+
+PreparedDataset = namedtuple("PreparedDataset", ["key", "math", "indices", "references", "samples", "batches",
+                                                 "context_tokens", "log"])
+
+
+def prepare_dataset(key, batch_size=1, token_budget=6000, offset=0, limit=None, context_tokens=0,
+                    model_name=DEFAULT_MODEL):
+    """
+    Read, compact and (for batch_size > 1) pack and render one sweep dataset once, so that
+    every model of the sweep is sent exactly the same prompts. Returns None if it is missing.
+    """
+    name, math = SWEEP_DATASETS[key]
+    path = find_dataset(DATA_DIR, name)
+    if path is None:
+        print(f"Dataset not found: {os.path.join(DATA_DIR, name + '.csv')}")
+        return None
+    records = list(TELEMETRY.timed_iter("dataset_load", iter_records(path, offset=offset, limit=limit)))
+    if math:
+        samples = [("", r.question) for r in records]
+        batches = None
+    else:
+        # The tokenizer only affects where passages are cut; the first model's is used for all
+        compactor = build_compactor(path, context_tokens, model_name, offset=offset, limit=limit)
+        samples = [(compact_context(compactor, r.context, r.question), r.question) for r in records]
+        batches = prepare_batches(samples, batch_size, token_budget) if batch_size > 1 else None
+    return PreparedDataset(key, math, [r.index for r in records], [str(r.answer).strip() for r in records],
+                           samples, batches, 0 if math else context_tokens,
+                           ResultsLog(os.path.join(DATA_DIR, f"{name}_results.jsonl")))
+
+
+def sweep_cell(prepared, model_name, engine, batch_size=1, mode="cot"):
+    """
+    Evaluate one prepared dataset with one model in one answer mode and return its row of the sweep matrix.
+    """
+    from scoring import answers_match
+
+    component = f"sweep[{model_name}|{mode}|{prepared.key}]"
+    prompt_version = prompt_version_for(batch_size, prepared.context_tokens, mode=mode, math=prepared.math)
+    engine.track_as = component
+    usage_before = TELEMETRY.model_usage(model_name)
+    start = time.perf_counter()
+    if prepared.math:
+        answers = engine.map(lambda s: classify_with_dspy(s[0], s[1], model_name=model_name, math=True, mode=mode),
+                             prepared.samples, capture_errors=True)
+    else:
+        answers = classify_samples(prepared.samples, engine, batch_size=batch_size, model_name=model_name,
+                                   batches=prepared.batches, mode=mode)
+    seconds = time.perf_counter() - start
+
+    failed = [isinstance(answer, RowError) for answer in answers]
+    # A failed row counts as a wrong answer in the matrix
+    correct = [bool(match) and not f for match, f in
+               zip(answers_match([None if f else a for a, f in zip(answers, failed)], prepared.references), failed)]
+    with TELEMETRY.stage("results_log"):
+        for index, reference, answer, is_correct in zip(prepared.indices, prepared.references, answers, correct):
+            prepared.log.append({
+                "index": index,
+                "model": model_name,
+                "prompt_version": prompt_version,
+                "reference": reference,
+                **answer_fields(answer),
+                "correct": bool(is_correct),
+            })
+
+    usage_after = TELEMETRY.model_usage(model_name)
+    latency = TELEMETRY.snapshot()["calls"].get(component, {})
+    rows = len(answers)
+    return {
+        "model": model_name,
+        "answer_mode": mode,
+        "dataset": prepared.key,
+        "rows": rows,
+        "failed": sum(failed),
+        "accuracy": sum(correct) / rows if rows else 0.0,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        "p50_seconds": latency.get("p50_seconds", 0.0),
+        "p95_seconds": latency.get("p95_seconds", 0.0),
+        "prompt_tokens": usage_after["prompt_tokens"] - usage_before["prompt_tokens"],
+        "completion_tokens": usage_after["completion_tokens"] - usage_before["completion_tokens"],
+        "cost_usd": usage_after["cost_usd"] - usage_before["cost_usd"],
+    }
+
+
+def run_model_sweep(models, datasets=("html", "md"), concurrency=4, rpm=20, max_retries=5, batch_size=1,
+                    token_budget=6000, offset=0, limit=None, context_tokens=0, answer_modes=("cot",)):
+    """
+    Evaluate every model (in every answer mode) on every dataset in one run and print a
+    model x dataset matrix.
+
+    Each dataset is read and its prompts prepared once, then all models run concurrently,
+    each with its own engine: concurrency, rpm and max_retries apply per model, since
+    providers rate-limit every model separately. Every answer is appended to the dataset's
+    results log under its model name, and the matrix is written to data/model_sweep.csv.
+    Prepared datasets are held in memory, so use --limit for large ones.
+    """
+    import pandas as pd
+
+    prepared = [p for p in (prepare_dataset(key, batch_size, token_budget, offset, limit, context_tokens,
+                                            model_name=models[0]) for key in datasets) if p is not None]
+    if not prepared:
+        return
+    print(f"Sweeping {len(models)} model(s) over {', '.join(p.key for p in prepared)} "
+          f"({sum(len(p.samples) for p in prepared)} prepared row(s))")
+
+    def run_model(model_name):
+        engine = EvaluationEngine(concurrency=concurrency, rpm=rpm, max_retries=max_retries)
+        cells = []
+        # Answer modes of one model run one after the other so they share its rate limit
+        for mode in answer_modes:
+            for dataset in prepared:
+                cell = sweep_cell(dataset, model_name, engine, batch_size=batch_size, mode=mode)
+                print(f"{model_name} [{mode}] | {dataset.key}: accuracy {cell['accuracy']:.2f} on {cell['rows']} "
+                      f"row(s) in {cell['seconds']:.1f}s" + (f", {cell['failed']} failed" if cell["failed"] else ""))
+                cells.append(cell)
+        engine.close()
+        return cells
+
+    with ThreadPoolExecutor(max_workers=len(models)) as pool:
+        cells = [cell for model_cells in pool.map(run_model, models) for cell in model_cells]
+
+    matrix = pd.DataFrame(cells)
+    for column, title, fmt in (("accuracy", "Accuracy", "{:.3f}"), ("p95_seconds", "p95 latency (s)", "{:.2f}"),
+                               ("prompt_tokens", "Prompt tokens", "{:.0f}"),
+                               ("completion_tokens", "Completion tokens", "{:.0f}"), ("cost_usd", "Cost (USD)", "{:.4f}")):
+        table = matrix.pivot(index=["model", "answer_mode"], columns="dataset", values=column)
+        table = table.reindex(index=pd.MultiIndex.from_product([models, list(answer_modes)]))
+        print(f"\n{title}:")
+        print(table.to_string(float_format=fmt.format))
+    sweep_csv = os.path.join(DATA_DIR, "model_sweep.csv")
+    with TELEMETRY.stage("csv_write"):
+        matrix.to_csv(sweep_csv, index=False)
+    print(f"\nSweep matrix saved to {sweep_csv}")
+    print_run_summary()
+
+
+def run_service(engine, host="127.0.0.1", port=8080, batch_size=1, token_budget=6000, window_ms=20,
+                max_queue=256, model_name=DEFAULT_MODEL):
+    """
+    Serve /classify and /classify_batch over HTTP with a warm classifier (see classification_service.py).
+    Concurrent rows are micro-batched into waves of the engine's concurrency (times batch_size).
+    """
+    def classify_fn(samples):
+        return classify_samples(samples, engine, batch_size=batch_size, token_budget=token_budget,
+                                model_name=model_name)
+
+    def warmup():
+        # Building the modules also loads LiteLLM, so the first request does not pay for it
+        CLASSIFIER_REGISTRY.get(model_name, CLASSIFIER_REGISTRY.kind())
+        if batch_size > 1:
+            CLASSIFIER_REGISTRY.get(model_name, "batch")
+
+    serve(classify_fn, host=host, port=port, engine=engine, max_batch=wave_size(engine, batch_size),
+          window_ms=window_ms, max_queue=max_queue, warmup=warmup)
+    print_run_summary()
+
+
+# Heavy modules each task needs, imported (and timed) before it starts. LiteLLM is not
+# listed: ClassifierRegistry loads it when it builds the first classifier module.
+TASK_IMPORTS = {
+    "math": ("classifier_modules", "scoring"),
+    "html": ("classifier_modules", "scoring"),
+    "md": ("classifier_modules", "scoring"),
+    "benchmark": ("classifier_modules", "scoring"),
+    "summarize": ("scoring",),
+    "merge": ("scoring",),
+    "sweep": ("classifier_modules", "scoring"),
+    "serve": ("classifier_modules",),
+}
+
+
+def import_task_dependencies(task):
+    """
+    Import the heavy modules of a task (see TASK_IMPORTS).
+    """
+    for name in TASK_IMPORTS.get(task, ()):
+        importlib.import_module(name)
+
+
+def run_task(args, engine):
+    """
+    Dispatch the parsed command-line arguments to the selected task.
+    """
+    with TELEMETRY.stage("imports"):
+        import_task_dependencies(args.task)
+    model_name = args.models[0]
+    if args.task == "math":
+        main_math(engine, offset=args.offset, limit=args.limit if args.limit is not None else 10,
+                  model_name=model_name)
+    elif args.task == "html":
+        main_html(engine, batch_size=args.batch_size, token_budget=args.token_budget,
+                  offset=args.offset, limit=args.limit, resume=args.resume, context_tokens=args.context_tokens,
+                  cascade=args.cascade, cascade_model=args.cascade_model, model_name=model_name,
+                  dedup=args.dedup, shard=args.shard)
+    elif args.task == "md":
+        main_md(engine, batch_size=args.batch_size, token_budget=args.token_budget,
+                offset=args.offset, limit=args.limit, resume=args.resume, context_tokens=args.context_tokens,
+                cascade=args.cascade, cascade_model=args.cascade_model, model_name=model_name,
+                dedup=args.dedup, shard=args.shard)
+    elif args.task == "benchmark":
+        benchmark_html_vs_md(engine, batch_size=args.batch_size, token_budget=args.token_budget,
+                             offset=args.offset, limit=args.limit, resume=args.resume,
+                             context_tokens=args.context_tokens, model_name=model_name, shard=args.shard)
+    elif args.task == "summarize":
+        summarize_benchmark(model_name=model_name,
+                            prompt_version=prompt_version_for(args.batch_size, args.context_tokens))
+    elif args.task == "merge":
+        try:
+            merge_results()
+        except ValueError as e:
+            # e.g. shard logs left over from a run with another shard count
+            raise SystemExit(f"error: {e}")
+    elif args.task == "sweep":
+        run_model_sweep(args.models, datasets=args.datasets, concurrency=args.concurrency, rpm=args.rpm,
+                        max_retries=args.max_retries, batch_size=args.batch_size, token_budget=args.token_budget,
+                        offset=args.offset, limit=args.limit, context_tokens=args.context_tokens,
+                        answer_modes=args.answer_mode)
+    elif args.task == "serve":
+        run_service(engine, host=args.host, port=args.port, batch_size=args.batch_size,
+                    token_budget=args.token_budget, window_ms=args.batch_window_ms, max_queue=args.max_queue,
+                    model_name=model_name)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run OpenRouter evaluation scripts.")
     print('Please enter one of the arguments to run the required task:\n'
@@ -279,21 +1020,112 @@ if __name__ == "__main__":
           ' - html\n'
           ' - md\n'
           ' - benchmark\n'
+          ' - summarize\n'
+          ' - merge\n'
+          ' - sweep\n'
+          ' - serve\n'
           ' (default: --task math)')
     
     parser.add_argument(
         "--task",
-        choices=["math", "website", "html", "md", "benchmark"],
+        choices=["math", "website", "html", "md", "benchmark", "summarize", "merge", "sweep", "serve"],
         default='math',
-        help="Which main function to run: math, website, html, md, or benchmark (default: math)"
+        help="Which main function to run: math, website, html, md, benchmark, summarize "
+             "(rebuild the benchmark CSV from its results log), merge (combine --shard results logs), "
+             "sweep (every --models on every --datasets) or serve (HTTP classification service) (default: math)"
     )
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL], metavar="MODEL",
+                        help="LiteLLM model name(s); several only with --task sweep "
+                             f"(default: {DEFAULT_MODEL})")
+    parser.add_argument("--answer-mode", nargs="+", choices=ANSWER_MODES, default=["cot"],
+                        help="cot: chain of thought (free text for math); direct: one capped, typed yes/no "
+                             "(or integer) answer. Several only with --task sweep (default: cot)")
+    parser.add_argument("--datasets", nargs="+", choices=sorted(SWEEP_DATASETS), default=["html", "md"],
+                        help="Datasets evaluated by --task sweep (default: html md)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum number of LLM requests in flight at once (default: 4)")
+    parser.add_argument("--rpm", type=float, default=20,
+                        help="Requests-per-minute limit across all workers, 0 disables it (default: 20)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries with exponential backoff on 429/5xx responses (default: 5)")
+    parser.add_argument("--cache", choices=CACHE_MODES, default="read-write",
+                        help="LLM response cache mode (default: read-write)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Samples packed into one LLM request for html, md and benchmark (default: 1)")
+    parser.add_argument("--token-budget", type=int, default=6000,
+                        help="Maximum estimated prompt tokens per batched request (default: 6000)")
+    parser.add_argument("--offset", type=int, default=0,
+                        help="Skip this many rows of the dataset before evaluating (default: 0)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Evaluate at most this many rows (default: all, 10 for math)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip rows already in the results log for the same model and prompt version")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="Write per-call latency, token, cost and stage timings as JSON")
+    parser.add_argument("--metrics-prom", metavar="PATH",
+                        help="Write the same metrics in Prometheus text format")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Profile the run with cProfile and write the stats to PATH "
+                             "(worker threads show up as time waiting on the engine)")
+    parser.add_argument("--cascade", type=float, metavar="THRESHOLD",
+                        help="html/md: answer rows the local TF-IDF classifier is at least this confident "
+                             "about (0-1) locally and escalate only the rest to the LLM")
+    parser.add_argument("--cascade-model", metavar="PATH",
+                        help="Saved local classifier (see local_classifier.py) instead of training one per run")
+    parser.add_argument("--dedup", type=float, metavar="THRESHOLD",
+                        help="html/md: classify one page per cluster of exact or near-duplicate pages "
+                             "(estimated Jaccard similarity >= THRESHOLD, 1.0 for exact only) and copy its answer")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="html/md/benchmark: evaluate only shard i of N (0-based, rows assigned by source "
+                             "file) into its own results log; --rpm is split evenly between the N shards")
+    parser.add_argument("--host", default="127.0.0.1", help="serve: address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="serve: port to listen on (default: 8080)")
+    parser.add_argument("--batch-window-ms", type=float, default=20,
+                        help="serve: how long a request may wait for its micro-batch to fill (default: 20)")
+    parser.add_argument("--max-queue", type=int, default=256,
+                        help="serve: queued rows beyond which requests get HTTP 429 (default: 256)")
+    parser.add_argument("--context-tokens", type=int, default=0,
+                        help="Compact each html/md context to this many tokens, dropping corpus-wide "
+                             "boilerplate and keeping the most relevant passages (default: 0, off)")
     args = parser.parse_args()
+    if len(args.models) > 1 and args.task != "sweep":
+        parser.error("several --models need --task sweep")
+    if len(args.answer_mode) > 1 and args.task != "sweep":
+        parser.error("several --answer-mode values need --task sweep")
+    if args.shard is not None and args.task not in ("html", "md", "benchmark"):
+        parser.error("--shard needs --task html, md or benchmark")
+    CLASSIFIER_REGISTRY.answer_mode = args.answer_mode[0]
 
-    if args.task == "math":
-        main_math()
-    elif args.task == "html":
-        main_html()
-    elif args.task == "md":
-        main_md()
-    elif args.task == "benchmark":
-        benchmark_html_vs_md()
\ No newline at end of file
+    configure_cache(args.cache)
+
+    rpm = args.rpm
+    if args.shard is not None and rpm:
+        # The provider's quota is shared by every shard process
+        rpm = args.rpm / args.shard[1]
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: rate limit {rpm:g} requests/minute of {args.rpm:g}")
+    engine = EvaluationEngine(concurrency=args.concurrency, rpm=rpm, max_retries=args.max_retries)
+
+    if args.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        with TELEMETRY.stage("task"):
+            profiler.runcall(run_task, args, engine)
+        profiler.dump_stats(args.profile)
+        print(f"\nProfile written to {args.profile} (top functions by cumulative time):")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        with TELEMETRY.stage("task"):
+            run_task(args, engine)
+    # Writes the cache's buffered access times
+    get_cache().close()
+
+    if args.metrics_json:
+        with open(args.metrics_json, "w", encoding="utf-8") as f:
+            f.write(TELEMETRY.to_json())
+        print(f"Metrics written to {args.metrics_json}")
+    if args.metrics_prom:
+        with open(args.metrics_prom, "w", encoding="utf-8") as f:
+            f.write(TELEMETRY.to_prometheus())
+        print(f"Prometheus metrics written to {args.metrics_prom}")
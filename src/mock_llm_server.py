@@ -0,0 +1,206 @@
+"""
+Local OpenAI-compatible stand-in for OpenRouter, for offline and deterministic runs.
+
+Serves POST /v1/chat/completions (and /chat/completions). Answers are taken from a
+recorded-responses file when the prompt is found there, otherwise synthesised
+deterministically from the prompt:
+    - math prompts ("What is a + b?") get the sum,
+    - classification prompts get "yes" when the content contains the marker phrase
+      "apply for this grant" and "no" otherwise,
+    - batched prompts get a JSON array with one such label per "### Item",
+    - DSPy adapter prompts get every requested [[ ## field ## ]] filled in.
+Latency, HTTP 500 error rate and 429 rate-limit injection are configurable and seeded,
+so runs are repeatable.
+
+Usage:
+    python src/mock_llm_server.py --port 8099 --latency-ms 200 --rate-limit-rate 0.05
+    OPENROUTER_API_BASE=http://127.0.0.1:8099/v1 OPENROUTER_API_KEY=mock python src/main.py --task html
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+POSITIVE_MARKER = "apply for this grant"
+
+_FIELD_RE = re.compile(r"\[\[ ## (\w+) ## \]\]")
+_MATH_RE = re.compile(r"What is (-?\d+) \+ (-?\d+)")
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def classify_text(text):
+    return "yes" if POSITIVE_MARKER in text.lower() else "no"
+
+
+def synthesize_answer(messages):
+    """
+    Deterministic answer for a chat request, based only on its messages.
+    """
+    prompt = messages[-1]["content"] if messages else ""
+    if isinstance(prompt, list):
+        prompt = " ".join(part.get("text", "") for part in prompt if isinstance(part, dict))
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+
+    math = _MATH_RE.search(prompt)
+    if "### Item" in prompt:
+        items = prompt.split("### Item")[1:]
+        value = json.dumps([classify_text(item) for item in items])
+    elif math:
+        value = str(int(math.group(1)) + int(math.group(2)))
+    else:
+        value = classify_text(prompt)
+
+    # DSPy chat adapter: answer every output field it asks for, then the completion marker
+    requested = _FIELD_RE.findall(prompt.split("Respond with", 1)[-1]) if "Respond with" in prompt else []
+    if not requested and "[[ ## completed ## ]]" in system:
+        requested = _FIELD_RE.findall(system.split("outputs will be", 1)[-1])
+    fields = [f for f in dict.fromkeys(requested) if f != "completed"]
+    if fields:
+        parts = []
+        for field in fields:
+            text = "Mock reasoning." if field == "reasoning" else value
+            parts.append(f"[[ ## {field} ## ]]\n{text}")
+        parts.append("[[ ## completed ## ]]")
+        return "\n\n".join(parts)
+    return value
+
+
+class MockLLMConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, responses=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.responses = responses or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        config = self.config
+        with config.lock:
+            config.requests += 1
+            draw = config.random.random()
+            delay = max(0.0, config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if draw < config.rate_limit_rate:
+            with config.lock:
+                config.rate_limited += 1
+            self._send_json(429, {"error": {"message": "Rate limit exceeded (mock)", "code": 429}},
+                            headers={"Retry-After": str(config.retry_after)})
+            return
+        if draw < config.rate_limit_rate + config.error_rate:
+            with config.lock:
+                config.errors += 1
+            self._send_json(500, {"error": {"message": "Internal error (mock)", "code": 500}})
+            return
+
+        messages = request.get("messages") or []
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        content = config.responses.get(prompt_hash(prompt))
+        if content is None:
+            content = synthesize_answer(messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        self._send_json(200, {
+            "id": f"mock-{config.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": max(1, len(content) // 4),
+                "total_tokens": prompt_tokens + max(1, len(content) // 4),
+            },
+        })
+
+
+def load_responses(path):
+    """
+    Load recorded responses: a JSON object mapping prompts (or their SHA-256) to answers.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        recorded = json.load(f)
+    return {k if re.fullmatch(r"[0-9a-f]{64}", k) else prompt_hash(k): v for k, v in recorded.items()}
+
+
+def start_mock_server(host="127.0.0.1", port=0, **config_kwargs):
+    """
+    Start the mock server in a daemon thread. Returns (server, api_base); stop with server.shutdown().
+    """
+    config = MockLLMConfig(**config_kwargs)
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mean response latency (default: 0)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform latency jitter (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--responses", help="JSON file of recorded responses to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, api_base = start_mock_server(
+        args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+        responses=load_responses(args.responses) if args.responses else None,
+    )
+    print(f"Mock LLM server listening on {api_base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,169 @@
+"""
+Exact and near-duplicate detection for page contexts, so each distinct page is classified once.
+
+Crawls of funding sites contain many copies of the same page (paginated listings, mirrored
+calls, templated pages). Rows are added in stream order and every row is mapped to a
+representative, the earliest row it duplicates:
+    1. exact duplicates are found by hashing the normalized text (lowercase words),
+    2. near duplicates by MinHash signatures over word shingles, with locality-sensitive
+       hashing (bands of the signature) to find candidates; a candidate representative is
+       accepted when the estimated Jaccard similarity is at least the threshold.
+Only representatives enter the index, so a cluster never drifts away from its first page.
+Rows are only grouped with rows that ask the same question.
+
+Usage:
+    python src/main.py --task html --dedup 0.9     # classify one page per cluster, copy its label
+    python src/near_duplicates.py data/html_content_classification.csv --threshold 0.9
+"""
+
+import argparse
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _words(text):
+    return _WORD.findall(str(text).lower())
+
+
+def lsh_bands(threshold, num_perm):
+    """
+    Return (bands, rows) so that a pair at the threshold similarity becomes a candidate with
+    probability >= 0.99, using as many rows per band as possible to keep candidates few.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= 0.99:
+            return bands, rows
+    return num_perm, 1
+
+
+class NearDuplicateIndex:
+    """
+    Args:
+        threshold (float): Minimum estimated Jaccard similarity of word shingles for two pages to
+            be near duplicates; 1.0 only groups exact (normalized) duplicates.
+        num_perm (int): MinHash signature length.
+        shingle_words (int): Words per shingle.
+        seed (int): Seed of the MinHash permutations, fixed so clusters are reproducible.
+    """
+
+    def __init__(self, threshold=0.9, num_perm=128, shingle_words=5, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.bands, self.band_rows = lsh_bands(threshold, num_perm)
+        self._exact = {}
+        self._buckets = {}
+        self._signatures = {}
+        self._representative = {}
+        self.rows = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def signature(self, words):
+        """
+        MinHash signature of the word shingles of a page (texts shorter than one shingle are one shingle).
+        """
+        k = self.shingle_words
+        shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64,
+                             count=len(shingles))
+        # Universal hashing (a * x + b) mod p; uint64 wrap-around is part of the hash
+        permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def add(self, key, text, group=""):
+        """
+        Index a row and return the key of its representative (key itself for a new page).
+
+        Args:
+            key: Row identifier, e.g. the dataset row index.
+            text (str): Page content.
+            group (str): Rows are only matched within the same group, e.g. the question.
+        """
+        self.rows += 1
+        words = _words(text)
+        digest = hashlib.blake2b(f"{group}\0{' '.join(words)}".encode("utf-8"), digest_size=16).digest()
+        representative = self._exact.get(digest)
+        if representative is not None:
+            self.exact_duplicates += 1
+            self._representative[key] = representative
+            return representative
+
+        if self.threshold < 1.0 and words:
+            signature = self.signature(words)
+            band_keys = [(group, band, signature[band * self.band_rows:(band + 1) * self.band_rows].tobytes())
+                         for band in range(self.bands)]
+            candidates = sorted({c for band_key in band_keys for c in self._buckets.get(band_key, ())},
+                                key=lambda c: self._signatures[c][1])
+            for candidate in candidates:
+                if (self._signatures[candidate][0] == signature).mean() >= self.threshold:
+                    self.near_duplicates += 1
+                    self._representative[key] = candidate
+                    # Later exact copies of this page go straight to the same representative
+                    self._exact[digest] = candidate
+                    return candidate
+            self._signatures[key] = (signature, len(self._signatures))
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, []).append(key)
+
+        self._exact[digest] = key
+        self._representative[key] = key
+        return key
+
+    def representative(self, key):
+        return self._representative.get(key, key)
+
+    def summary(self, llm_rows_saved=None, batch_size=1):
+        """
+        Dedup counters; llm_rows_saved is the number of copied rows whose label came from the LLM.
+        """
+        duplicates = self.exact_duplicates + self.near_duplicates
+        stats = {
+            "rows": self.rows,
+            "clusters": self.rows - duplicates,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "dedup_ratio": duplicates / self.rows if self.rows else 0.0,
+        }
+        if llm_rows_saved is not None:
+            stats["llm_rows_saved"] = llm_rows_saved
+            stats["llm_calls_saved"] = -(-llm_rows_saved // max(1, batch_size))
+        return stats
+
+    def print_summary(self, label="", llm_rows_saved=None, batch_size=1):
+        stats = self.summary(llm_rows_saved, batch_size)
+        if not stats["rows"]:
+            return
+        print(f"{label}Dedup (threshold {self.threshold}): {stats['rows']} row(s) in {stats['clusters']} cluster(s), "
+              f"{stats['exact_duplicates']} exact and {stats['near_duplicates']} near duplicate(s), "
+              f"dedup ratio {stats['dedup_ratio']:.2f}")
+        if llm_rows_saved is not None:
+            print(f"  {stats['llm_rows_saved']} row(s) copied instead of sent to the LLM, "
+                  f"~{stats['llm_calls_saved']} LLM call(s) saved")
+
+
+if __name__ == "__main__":
+    from dataset_loader import iter_records
+
+    parser = argparse.ArgumentParser(description="Report exact and near-duplicate pages in a classification dataset.")
+    parser.add_argument("dataset", nargs="+", help="Dataset file(s) (.csv, .jsonl or .parquet)")
+    parser.add_argument("--threshold", type=float, default=0.9,
+                        help="Minimum estimated Jaccard similarity for near duplicates (default: 0.9)")
+    args = parser.parse_args()
+
+    for path in args.dataset:
+        index = NearDuplicateIndex(args.threshold)
+        for record in iter_records(path):
+            index.add(record.index, record.context, record.question or "")
+        index.print_summary(f"{path}: ")
@@ -0,0 +1,16 @@
+"""
+Prompt template versions of the classifier modules, keyed like classifier_modules.MODULE_KINDS.
+
+The version is part of every response cache key and is recorded in the result logs, so
+bump it whenever a prompt template changes. It lives here rather than on the DSPy modules
+so the tasks that only read result logs (e.g. summarize) can resolve it without importing DSPy.
+"""
+
+PROMPT_VERSIONS = {
+    "classify": "classify-v1",
+    "math": "math-v1",
+    "batch": "batch-v1",
+    "classify-direct": "classify-direct-v1",
+    "math-direct": "math-direct-v1",
+    "ask": "ask-v1",
+}
@@ -0,0 +1,73 @@
+"""
+Append-only JSONL log of per-row evaluation results.
+
+Every completed row is appended (and flushed) as soon as it is scored, so an interrupted
+run loses at most the requests that were in flight. Records carry the model name and
+prompt version, which lets a resumed run skip rows that are already done and lets the
+summary be recomputed from the log at any time without calling the LLM again.
+"""
+
+import json
+import os
+import threading
+
+
+class ResultsLog:
+    """
+    JSONL results log.
+
+    Args:
+        path (str): Location of the log file; created on first append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        """
+        Append one result record and flush it to disk.
+        """
+        line = json.dumps(record, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def iter_records(self):
+        """
+        Yield every record in the log. A truncated last line (from a crash mid-write) is skipped.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def latest(self, model=None, prompt_version=None):
+        """
+        Return {index: record} with the most recent record per row for this model and prompt version.
+        """
+        results = {}
+        for record in self.iter_records():
+            if model is not None and record.get("model") != model:
+                continue
+            if prompt_version is not None and record.get("prompt_version") != prompt_version:
+                continue
+            results[record["index"]] = record
+        return results
+
+    def completed(self, model, prompt_version):
+        """
+        Row indices already recorded for this model and prompt version; rows whose latest
+        record is a failure (it has an "error" field) are left out so they are retried.
+        """
+        return {index for index, record in self.latest(model, prompt_version).items() if "error" not in record}
@@ -0,0 +1,295 @@
+"""
+Shared, vectorized answer scoring and metrics for every task.
+
+Answers and references are normalized column-wise with pandas string operations (one
+rule set for math, html, md and the benchmark), then compared as NumPy arrays. On top of
+accuracy it computes a confusion matrix, precision/recall/F1 for the positive label and,
+for the HTML vs Markdown benchmark, paired agreement and McNemar's test.
+
+Confidence intervals come from a bootstrap over rows. The statistics only depend on the
+cell counts of a contingency table, so resampling rows is equivalent to drawing the cell
+counts from a multinomial distribution; this makes the bootstrap cost independent of the
+number of rows and lets a million-row results log be rescored in seconds.
+
+Usage:
+    python src/scoring.py data/html_content_classification_results.jsonl
+    python src/scoring.py data/benchmark_html_vs_md.jsonl --model <model> --prompt-version classify-v1
+"""
+
+import argparse
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from results_log import ResultsLog
+
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_ALPHA = 0.05
+
+_WHOLE_FLOAT = re.compile(r"^(-?\d+)\.0+$")
+
+
+def normalize_answer(value):
+    """
+    Normalize one answer: lowercase, no markdown emphasis, no trailing period, "12.0" -> "12".
+    """
+    if value is None or value != value:
+        return ""
+    text = str(value).replace("*", "").strip().lower()
+    text = _WHOLE_FLOAT.sub(r"\1", text)
+    return text.rstrip(".").strip()
+
+
+def normalize_answers(values):
+    """
+    Vectorized normalize_answer over a column; returns a string Series.
+
+    Answer columns hold few distinct values, so only the distinct values are normalized and
+    the result is broadcast back with their codes.
+    """
+    series = pd.Series(values, dtype="object")
+    codes, uniques = pd.factorize(series)
+    # Code -1 (missing value) picks the trailing empty string
+    normalized = np.array([normalize_answer(u) for u in uniques] + [""], dtype=object)
+    return pd.Series(normalized[codes], index=series.index)
+
+
+def answers_match(answers, references):
+    """
+    Boolean array: normalized answer equals normalized reference, row by row.
+    """
+    return (normalize_answers(answers).to_numpy() == normalize_answers(references).to_numpy())
+
+
+def confusion_matrix(references, answers, labels=None):
+    """
+    Confusion matrix as a DataFrame (rows: reference label, columns: answer label).
+    """
+    references = normalize_answers(references)
+    answers = normalize_answers(answers)
+    if labels is None:
+        labels = sorted(set(references.unique()) | set(answers.unique()))
+    ref_codes = pd.Categorical(references, categories=labels).codes
+    ans_codes = pd.Categorical(answers, categories=labels).codes
+    valid = (ref_codes >= 0) & (ans_codes >= 0)
+    k = len(labels)
+    counts = np.bincount(ref_codes[valid].astype(np.int64) * k + ans_codes[valid], minlength=k * k).reshape(k, k)
+    return pd.DataFrame(counts, index=pd.Index(labels, name="reference"), columns=pd.Index(labels, name="answer"))
+
+
+def binary_counts(references, answers, positive="yes"):
+    """
+    Return [tp, fp, fn, tn] for the positive label.
+    """
+    ref = normalize_answers(references).to_numpy() == positive
+    ans = normalize_answers(answers).to_numpy() == positive
+    return np.array([np.sum(ref & ans), np.sum(~ref & ans), np.sum(ref & ~ans), np.sum(~ref & ~ans)])
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+
+def _binary_stats(counts):
+    # counts has shape (..., 4) = tp, fp, fn, tn; works on one table or a stack of bootstrap tables
+    tp, fp, fn, tn = (counts[..., i].astype(float) for i in range(4))
+    return {
+        "accuracy": _ratio(tp + tn, tp + fp + fn + tn),
+        "precision": _ratio(tp, tp + fp),
+        "recall": _ratio(tp, tp + fn),
+        "f1": _ratio(2 * tp, 2 * tp + fp + fn),
+    }
+
+
+def bootstrap_tables(counts, n_boot=DEFAULT_BOOTSTRAP, seed=0):
+    """
+    Bootstrap replicates of a contingency table: n_boot multinomial draws of its cell counts.
+    """
+    counts = np.asarray(counts)
+    total = int(counts.sum())
+    if not total or not n_boot:
+        return np.empty((0, counts.size), dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(total, counts.ravel() / total, size=n_boot)
+
+
+def _interval(replicates, alpha):
+    replicates = replicates[~np.isnan(replicates)]
+    if not replicates.size:
+        return (float("nan"), float("nan"))
+    low, high = np.percentile(replicates, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+    return (float(low), float(high))
+
+
+def binary_metrics(references, answers, positive="yes", n_boot=DEFAULT_BOOTSTRAP, alpha=DEFAULT_ALPHA, seed=0):
+    """
+    Accuracy, precision, recall and F1 for the positive label, each as (value, ci_low, ci_high).
+    """
+    counts = binary_counts(references, answers, positive)
+    point = _binary_stats(counts)
+    replicates = _binary_stats(bootstrap_tables(counts, n_boot, seed))
+    metrics = {name: (float(value),) + _interval(replicates[name], alpha) for name, value in point.items()}
+    metrics["counts"] = dict(zip(("tp", "fp", "fn", "tn"), (int(c) for c in counts)))
+    metrics["rows"] = int(counts.sum())
+    return metrics
+
+
+def mcnemar(b, c):
+    """
+    McNemar's test on the discordant pair counts b and c. Returns (statistic, p_value): the exact
+    binomial test for fewer than 25 discordant pairs, else chi-squared with continuity correction.
+    """
+    n = b + c
+    if n == 0:
+        return (0.0, 1.0)
+    if n < 25:
+        tail = sum(math.comb(n, k) for k in range(min(b, c) + 1)) / 2 ** n
+        return (float(min(b, c)), min(1.0, 2 * tail))
+    statistic = (abs(b - c) - 1) ** 2 / n
+    return (statistic, math.erfc(math.sqrt(statistic / 2)))
+
+
+def paired_metrics(references, answers_a, answers_b, n_boot=DEFAULT_BOOTSTRAP, alpha=DEFAULT_ALPHA, seed=0):
+    """
+    Compare two answer columns for the same rows (e.g. HTML vs Markdown).
+
+    Returns the accuracy of each, their difference (a - b), the agreement rate between the
+    two answer columns, each with a bootstrap CI, and McNemar's test on the correctness pairs.
+    """
+    a = normalize_answers(answers_a).to_numpy()
+    b = normalize_answers(answers_b).to_numpy()
+    ref = normalize_answers(references).to_numpy()
+    a_ok, b_ok, agree = a == ref, b == ref, a == b
+    # 2x2 correctness table split by agreement: both right, a only, b only, both wrong & agree, both wrong & differ
+    both_wrong = ~a_ok & ~b_ok
+    counts = np.array([np.sum(a_ok & b_ok), np.sum(a_ok & ~b_ok), np.sum(~a_ok & b_ok),
+                       np.sum(both_wrong & agree), np.sum(both_wrong & ~agree)])
+
+    def stats(tables):
+        tables = tables.astype(float)
+        total = tables.sum(axis=-1)
+        acc_a = _ratio(tables[..., 0] + tables[..., 1], total)
+        acc_b = _ratio(tables[..., 0] + tables[..., 2], total)
+        return {
+            "a_accuracy": acc_a,
+            "b_accuracy": acc_b,
+            "difference": acc_a - acc_b,
+            "agreement": _ratio(tables[..., 0] + tables[..., 3], total),
+        }
+
+    point = stats(counts)
+    replicates = stats(bootstrap_tables(counts, n_boot, seed))
+    metrics = {name: (float(value),) + _interval(replicates[name], alpha) for name, value in point.items()}
+    statistic, p_value = mcnemar(int(counts[1]), int(counts[2]))
+    metrics["mcnemar"] = {"a_only_correct": int(counts[1]), "b_only_correct": int(counts[2]),
+                          "statistic": statistic, "p_value": p_value}
+    metrics["rows"] = int(counts.sum())
+    return metrics
+
+
+def load_results(path, model=None, prompt_version=None):
+    """
+    Load a JSONL results log into a DataFrame with the latest record per row index for this
+    model and prompt version (the vectorized counterpart of ResultsLog.latest).
+    """
+    # Parsing line by line is as fast as pd.read_json here and skips a truncated last line
+    frame = pd.DataFrame.from_records(list(ResultsLog(path).iter_records()))
+    if frame.empty or "index" not in frame:
+        return frame
+    if model is not None and "model" in frame:
+        frame = frame[frame["model"] == model]
+    if prompt_version is not None and "prompt_version" in frame:
+        frame = frame[frame["prompt_version"] == prompt_version]
+    keys = [c for c in ("model", "prompt_version") if c in frame] + ["index"]
+    return frame.drop_duplicates(keys, keep="last").sort_values(keys).reset_index(drop=True)
+
+
+def drop_failed(results):
+    """
+    Split off the rows whose LLM call failed (an "error" field is set): they have no answer and
+    are retried by --resume, so they must not be scored as wrong. Returns (scored rows, failed count).
+    """
+    if results.empty or "error" not in results:
+        return results, 0
+    failed = results["error"].notna()
+    return results[~failed], int(failed.sum())
+
+
+def _format(metric):
+    value, low, high = metric
+    return f"{value:.3f} [{low:.3f}, {high:.3f}]"
+
+
+def print_classification_report(references, answers, positive="yes", n_boot=DEFAULT_BOOTSTRAP,
+                                alpha=DEFAULT_ALPHA, title="Metrics"):
+    """
+    Print accuracy, precision/recall/F1 with bootstrap CIs and the confusion matrix.
+    """
+    metrics = binary_metrics(references, answers, positive, n_boot=n_boot, alpha=alpha)
+    if not metrics["rows"]:
+        return metrics
+    level = f"{1 - alpha:.0%} CI"
+    print(f"{title} ({metrics['rows']} row(s), positive label '{positive}', {level}):")
+    for name in ("accuracy", "precision", "recall", "f1"):
+        print(f"  {name:<9} {_format(metrics[name])}")
+    print("  confusion matrix:")
+    for line in confusion_matrix(references, answers).to_string().splitlines():
+        print(f"    {line}")
+    return metrics
+
+
+def print_paired_report(references, answers_a, answers_b, labels=("HTML", "MD"), n_boot=DEFAULT_BOOTSTRAP,
+                        alpha=DEFAULT_ALPHA):
+    """
+    Print the paired comparison of two answer columns.
+    """
+    metrics = paired_metrics(references, answers_a, answers_b, n_boot=n_boot, alpha=alpha)
+    if not metrics["rows"]:
+        return metrics
+    a, b = labels
+    test = metrics["mcnemar"]
+    print(f"Paired {a} vs {b} ({metrics['rows']} row(s), {1 - alpha:.0%} CI):")
+    rows = [(f"{a} accuracy", "a_accuracy"), (f"{b} accuracy", "b_accuracy"),
+            (f"difference ({a}-{b})", "difference"), ("answer agreement", "agreement")]
+    width = max(len(name) for name, _ in rows)
+    for name, key in rows:
+        print(f"  {name:<{width}} {_format(metrics[key])}")
+    print(f"  McNemar: {a} only correct {test['a_only_correct']}, {b} only correct {test['b_only_correct']}, "
+          f"statistic {test['statistic']:.3f}, p = {test['p_value']:.4f}")
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore a results log (no LLM calls).")
+    parser.add_argument("log", help="JSONL results log, e.g. data/html_content_classification_results.jsonl")
+    parser.add_argument("--model", help="Only rows for this model")
+    parser.add_argument("--prompt-version", help="Only rows for this prompt version")
+    parser.add_argument("--positive", default="yes", help="Positive label (default: yes)")
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP, help="Bootstrap replicates (default: 1000)")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="1 - confidence level (default: 0.05)")
+    args = parser.parse_args()
+
+    results = load_results(args.log, args.model, args.prompt_version)
+    if results.empty:
+        raise SystemExit(f"No results in {args.log} for the selected model and prompt version")
+    results, failed = drop_failed(results)
+    if failed:
+        print(f"{failed} row(s) failed and are not scored; rerun with --resume to retry them")
+    if results.empty:
+        raise SystemExit(f"No scored results in {args.log} for the selected model and prompt version")
+    keys = [c for c in ("model", "prompt_version") if c in results]
+    # One report per model and prompt version found in the log
+    for group, rows in (results.groupby(keys, sort=True) if keys else [((), results)]):
+        print(f"\n== {' / '.join(map(str, group if isinstance(group, tuple) else (group,)))} ==")
+        if "html_answer" in rows:
+            for column, label in (("html_answer", "HTML"), ("md_answer", "MD")):
+                print_classification_report(rows["reference"], rows[column], args.positive,
+                                            n_boot=args.bootstrap, alpha=args.alpha, title=label)
+            print_paired_report(rows["reference"], rows["html_answer"], rows["md_answer"],
+                                n_boot=args.bootstrap, alpha=args.alpha)
+        else:
+            print_classification_report(rows["reference"], rows["answer"], args.positive,
+                                        n_boot=args.bootstrap, alpha=args.alpha)
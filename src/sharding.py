@@ -0,0 +1,160 @@
+"""
+Key-based sharding of the evaluation datasets and deterministic merging of shard results.
+
+With main.py --shard i/N, a process only evaluates the rows whose stable key hashes to
+shard i of N (0 <= i < N), and writes them to its own results log next to the usual one,
+e.g. data/html_content_classification_results.shard-0-of-4.jsonl. The key comes from the
+file a row was built from (the source column written by dataset_builder.py) with its
+extension and html_/md_ prefix removed, so the HTML and Markdown versions of a page share
+a key and always land in the same shard, on any machine. Rows without a source fall back
+to their row position.
+
+main.py --task merge then combines the shard logs of each dataset into one results log,
+sorted by model, prompt version and row index, and prints the summary from it.
+
+Usage:
+    for i in 0 1 2 3; do python src/main.py --task html --shard $i/4 & done; wait
+    python src/main.py --task merge
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+
+from results_log import ResultsLog
+
+_KIND_PREFIX = re.compile(r"^(html|md)[_-]", re.IGNORECASE)
+_SHARD_SUFFIX = re.compile(r"\.shard-(\d+)-of-(\d+)\.jsonl$")
+
+
+def parse_shard(text):
+    """
+    Parse "i/N" into (i, N); used as an argparse type.
+    """
+    try:
+        index, count = (int(part) for part in str(text).split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..N-1, got {text!r}")
+    return index, count
+
+
+def record_key(record):
+    """
+    Stable key of a dataset row: its source file name without extension and kind prefix.
+    """
+    if record.source:
+        stem = os.path.splitext(os.path.basename(str(record.source)))[0]
+        return _KIND_PREFIX.sub("", stem)
+    return str(record.index)
+
+
+def key_hash(key):
+    """
+    Stable 64-bit hash of a record key (a content hash rather than hash(), which is salted per process).
+    """
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shard_of(key, count):
+    return key_hash(key) % count
+
+
+def in_shard(record, shard):
+    """
+    True if the record belongs to shard (i, N); every record does when shard is None.
+    """
+    return shard is None or shard_of(record_key(record), shard[1]) == shard[0]
+
+
+def shard_log_path(path, shard):
+    """
+    Results log of one shard, e.g. x_results.jsonl -> x_results.shard-1-of-4.jsonl.
+    """
+    if shard is None:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+
+def merged_log_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}.merged{ext}"
+
+
+def join_by_key(left, right):
+    """
+    Pair the records of two datasets with the same record_key, streaming both.
+
+    Rows pair up immediately when both datasets are in the same order; rows that arrive
+    out of order wait until their counterpart is read. Unpaired rows are dropped.
+    """
+    pending = ({}, {})
+    sides = [iter(left), iter(right)]
+    while sides[0] is not None or sides[1] is not None:
+        for side in (0, 1):
+            if sides[side] is None:
+                continue
+            record = next(sides[side], None)
+            if record is None:
+                sides[side] = None
+                continue
+            key = record_key(record)
+            match = pending[1 - side].pop(key, None)
+            if match is None:
+                pending[side][key] = record
+            else:
+                yield (record, match) if side == 0 else (match, record)
+    unpaired = len(pending[0]) + len(pending[1])
+    if unpaired:
+        print(f"{unpaired} row(s) without a counterpart in the other dataset were skipped")
+
+
+def find_shard_logs(path):
+    """
+    Return {N: {i: shard log path}} for the shard logs of the results log at path.
+    """
+    base, ext = os.path.splitext(path)
+    found = {}
+    for shard_path in glob.glob(f"{glob.escape(base)}.shard-*-of-*{ext}"):
+        match = _SHARD_SUFFIX.search(shard_path)
+        if match:
+            found.setdefault(int(match.group(2)), {})[int(match.group(1))] = shard_path
+    return found
+
+
+def merge_shard_logs(path):
+    """
+    Merge the shard logs of the results log at path into merged_log_path(path).
+
+    The latest record per (model, prompt version, row index) is kept and the output is
+    sorted by those fields, so the merged log is identical however the shards were run.
+    Returns (merged path, records written, shard count, missing shard indices), or None
+    when there are no shard logs.
+    """
+    found = find_shard_logs(path)
+    if not found:
+        return None
+    if len(found) > 1:
+        raise ValueError(f"Shard logs of {path} were written with different shard counts "
+                         f"({', '.join(str(n) for n in sorted(found))}); remove the stale ones")
+    count, shards = next(iter(found.items()))
+    missing = [i for i in range(count) if i not in shards]
+
+    latest = {}
+    for i in sorted(shards):
+        for record in ResultsLog(shards[i]).iter_records():
+            latest[(str(record.get("model")), str(record.get("prompt_version")), record["index"])] = record
+
+    out_path = merged_log_path(path)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for key in sorted(latest):
+            f.write(json.dumps(latest[key], default=str) + "\n")
+    os.replace(tmp_path, out_path)
+    return out_path, len(latest), count, missing
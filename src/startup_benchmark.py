@@ -0,0 +1,149 @@
+"""
+Startup-time benchmark for the command-line entry points of main.py.
+
+For every task it measures, in a fresh interpreter, how long `import main` takes and how
+long the task's own heavy imports take (main.TASK_IMPORTS), records which heavy
+dependencies each path loads, and times `main.py --help` end to end. LiteLLM is measured
+separately as "llm_client", since main.py only loads it when the first classifier module
+is built. The results are compared with a stored baseline so an import added at
+module level (or a task path that starts pulling in a new heavy dependency) is caught.
+
+Usage:
+    python src/startup_benchmark.py                      # compare against the baseline
+    python src/startup_benchmark.py --update-baseline    # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(SRC_DIR), "data", "startup_baseline.json")
+
+HEAVY_MODULES = ("dspy", "litellm", "pandas", "numpy", "sklearn")
+
+# Runs in a fresh interpreter; prints one JSON line with the timings of a task path
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+task = {task!r}
+if task == "llm_client":
+    main.install_litellm_callback()
+else:
+    main.import_task_dependencies(task)
+done = time.perf_counter()
+print(json.dumps({{
+    "import_main_seconds": imported - start,
+    "task_import_seconds": done - imported,
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _env():
+    # The key is not needed to import anything, and LiteLLM must not fetch its cost map
+    env = dict(os.environ, LITELLM_LOCAL_MODEL_COST_MAP="True")
+    env.pop("OPENROUTER_API_KEY", None)
+    return env
+
+
+def probe_task(task):
+    """
+    Import main and the dependencies of task in a fresh interpreter and return its timings.
+    """
+    code = _PROBE.format(src=SRC_DIR, task=task, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env(),
+                            cwd=SRC_DIR, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_help():
+    """
+    Wall time of `python src/main.py --help`, interpreter startup included.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(SRC_DIR, "main.py"), "--help"], capture_output=True,
+                   env=_env(), check=True)
+    return time.perf_counter() - start
+
+
+def measure(tasks, repeats=3):
+    """
+    Return {path: measurements}, keeping the fastest of repeats runs of every path.
+    """
+    results = {"help": {"total_seconds": round(min(time_help() for _ in range(repeats)), 4), "modules": []}}
+    for task in tasks:
+        runs = [probe_task(task) for _ in range(repeats)]
+        best = min(runs, key=lambda r: r["import_main_seconds"] + r["task_import_seconds"])
+        results[task] = {
+            "import_main_seconds": round(best["import_main_seconds"], 4),
+            "task_import_seconds": round(best["task_import_seconds"], 4),
+            "total_seconds": round(best["import_main_seconds"] + best["task_import_seconds"], 4),
+            "modules": best["modules"],
+        }
+    return results
+
+
+def compare(results, baseline, tolerance, slack):
+    """
+    Return a list of regression messages: a path slower than its baseline by more than
+    tolerance (plus slack seconds, for timer noise on fast paths), or loading a heavy
+    dependency it did not load before.
+    """
+    regressions = []
+    for path, current in results.items():
+        previous = baseline.get(path)
+        if not previous:
+            continue
+        if current["total_seconds"] > previous["total_seconds"] * (1 + tolerance) + slack:
+            regressions.append(f"{path}: {current['total_seconds']}s > baseline {previous['total_seconds']}s")
+        added = sorted(set(current["modules"]) - set(previous["modules"]))
+        if added:
+            regressions.append(f"{path}: now imports {', '.join(added)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, SRC_DIR)
+    from main import TASK_IMPORTS
+
+    paths = list(TASK_IMPORTS) + ["llm_client"]
+    parser = argparse.ArgumentParser(description="Measure the import cost of every main.py task path.")
+    parser.add_argument("--tasks", nargs="+", choices=paths, default=paths)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per path, the fastest is kept (default: 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative slowdown before a path counts as a regression (default: 0.5)")
+    parser.add_argument("--slack", type=float, default=0.1,
+                        help="Allowed absolute slowdown in seconds on top of the tolerance (default: 0.1)")
+    args = parser.parse_args()
+
+    results = measure(args.tasks, args.repeats)
+    print(f"{'path':<12} {'import main':>12} {'task imports':>13} {'total s':>8}  heavy modules")
+    for path, r in results.items():
+        print(f"{path:<12} {r.get('import_main_seconds', 0.0):>12.3f} {r.get('task_import_seconds', 0.0):>13.3f} "
+              f"{r['total_seconds']:>8.3f}  {', '.join(r['modules']) or '-'}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.slack)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
@@ -0,0 +1,272 @@
+"""
+Run telemetry: per-call latency distributions, retries, token usage, cost and stage timings.
+
+Two kinds of measurements are kept:
+    calls   One event per call of a component (e.g. "ClassifierModule", or
+            "ClassifierModule.llm" for the underlying HTTP request), with latency and,
+            where known, prompt/completion tokens and cost.
+    stages  Wall time accumulated per pipeline stage (dataset loading, results log I/O, ...).
+
+Token usage and cost come from a LiteLLM success callback; every LM tags its requests with
+metadata={"component": ...} so the callback can attribute them. Snapshots can be exported
+as JSON or in Prometheus text exposition format.
+
+Call counts and latency sums are cumulative, but percentiles are computed over the latest
+LATENCY_WINDOW calls of each component only, so a long-running process (the classification
+service) keeps constant memory and a /metrics scrape sorts at most that many values.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Latency samples kept per component for the percentiles
+LATENCY_WINDOW = 10000
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    # Smallest value with at least q of the values at or below it; the epsilon keeps float
+    # error in q * n (e.g. 0.07 * 100) from pushing an exact rank up by one
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values) - 1e-9) - 1))
+    return sorted_values[rank]
+
+
+class Telemetry:
+    def __init__(self, latency_window=LATENCY_WINDOW):
+        self.latency_window = latency_window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latencies = defaultdict(lambda: deque(maxlen=self.latency_window))
+            self.call_counts = defaultdict(int)
+            self.call_seconds = defaultdict(float)
+            self.prompt_tokens = defaultdict(int)
+            self.completion_tokens = defaultdict(int)
+            self.cost = defaultdict(float)
+            self.errors = defaultdict(int)
+            self.retries = 0
+            self.stages = defaultdict(float)
+            self.models = defaultdict(lambda: {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                               "cost_usd": 0.0})
+
+    def record_call(self, name, seconds, prompt_tokens=0, completion_tokens=0, cost=0.0, error=False):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            self.call_counts[name] += 1
+            self.call_seconds[name] += seconds
+            self.prompt_tokens[name] += prompt_tokens or 0
+            self.completion_tokens[name] += completion_tokens or 0
+            self.cost[name] += cost or 0.0
+            if error:
+                self.errors[name] += 1
+
+    def record_model_usage(self, model, prompt_tokens=0, completion_tokens=0, cost=0.0):
+        """
+        Add one provider request's token usage and cost to the totals of `model`.
+        """
+        with self._lock:
+            usage = self.models[model]
+            usage["requests"] += 1
+            usage["prompt_tokens"] += prompt_tokens or 0
+            usage["completion_tokens"] += completion_tokens or 0
+            usage["cost_usd"] += cost or 0.0
+
+    def model_usage(self, model):
+        """
+        Return a copy of the usage totals recorded for `model` so far.
+        """
+        with self._lock:
+            return dict(self.models[model]) if model in self.models else {
+                "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def add_stage_time(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] += seconds
+
+    @contextmanager
+    def track(self, name):
+        """
+        Time a call of component `name` (errors are counted, then re-raised).
+        """
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record_call(name, time.perf_counter() - start, error=failed)
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Add the wall time of the with-block to a pipeline stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.perf_counter() - start)
+
+    def timed_iter(self, stage, iterable):
+        """
+        Yield from iterable, charging the time spent producing each item to a stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_stage_time(stage, time.perf_counter() - start)
+                return
+            self.add_stage_time(stage, time.perf_counter() - start)
+            yield item
+
+    def snapshot(self):
+        """
+        Return all measurements as a JSON-serialisable dict.
+        """
+        with self._lock:
+            calls = {}
+            for name, values in self.latencies.items():
+                ordered = sorted(values)
+                calls[name] = {
+                    "count": self.call_counts[name],
+                    "errors": self.errors[name],
+                    "total_seconds": self.call_seconds[name],
+                    **{f"p{int(q * 100)}_seconds": percentile(ordered, q) for q in PERCENTILES},
+                    "prompt_tokens": self.prompt_tokens[name],
+                    "completion_tokens": self.completion_tokens[name],
+                    "cost_usd": self.cost[name],
+                }
+            return {"calls": calls, "retries": self.retries, "stages_seconds": dict(self.stages),
+                    "models": {name: dict(usage) for name, usage in self.models.items()}}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """
+        Render the snapshot in Prometheus text exposition format.
+        """
+        snap = self.snapshot()
+        lines = [
+            f"# HELP llm_call_latency_seconds Latency of component calls (quantiles over the last {self.latency_window}).",
+            "# TYPE llm_call_latency_seconds summary",
+        ]
+        for name, c in sorted(snap["calls"].items()):
+            for q in PERCENTILES:
+                lines.append(f'llm_call_latency_seconds{{component="{name}",quantile="{q}"}} '
+                             f'{c[f"p{int(q * 100)}_seconds"]:.6f}')
+            lines.append(f'llm_call_latency_seconds_sum{{component="{name}"}} {c["total_seconds"]:.6f}')
+            lines.append(f'llm_call_latency_seconds_count{{component="{name}"}} {c["count"]}')
+        for metric, key, help_text in (
+            ("llm_call_errors_total", "errors", "Failed component calls."),
+            ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens reported by the provider."),
+            ("llm_completion_tokens_total", "completion_tokens", "Completion tokens reported by the provider."),
+            ("llm_cost_usd_total", "cost_usd", "Estimated cost in USD."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, c in sorted(snap["calls"].items()):
+                lines.append(f'{metric}{{component="{name}"}} {c[key]}')
+        for metric, key, help_text in (
+            ("llm_model_prompt_tokens_total", "prompt_tokens", "Prompt tokens per model."),
+            ("llm_model_completion_tokens_total", "completion_tokens", "Completion tokens per model."),
+            ("llm_model_cost_usd_total", "cost_usd", "Estimated cost in USD per model."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for model, usage in sorted(snap["models"].items()):
+                lines.append(f'{metric}{{model="{model}"}} {usage[key]}')
+        lines.append("# HELP llm_retries_total Retried LLM requests (429/5xx).")
+        lines.append("# TYPE llm_retries_total counter")
+        lines.append(f"llm_retries_total {snap['retries']}")
+        lines.append("# HELP stage_seconds_total Wall time spent per pipeline stage.")
+        lines.append("# TYPE stage_seconds_total counter")
+        for stage, seconds in sorted(snap["stages_seconds"].items()):
+            lines.append(f'stage_seconds_total{{stage="{stage}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        snap = self.snapshot()
+        if not snap["calls"] and not snap["stages_seconds"]:
+            return
+        print("Telemetry:")
+        for name, c in sorted(snap["calls"].items()):
+            tokens = ""
+            if c["prompt_tokens"] or c["completion_tokens"]:
+                tokens = (f", tokens {c['prompt_tokens']} prompt / {c['completion_tokens']} completion"
+                          f", cost ${c['cost_usd']:.4f}")
+            print(f"  {name}: {c['count']} call(s), p50 {c['p50_seconds']:.2f}s, p95 {c['p95_seconds']:.2f}s, "
+                  f"p99 {c['p99_seconds']:.2f}s{tokens}")
+        if snap["retries"]:
+            print(f"  retries: {snap['retries']}")
+        for stage, seconds in sorted(snap["stages_seconds"].items()):
+            print(f"  stage {stage}: {seconds:.2f}s")
+
+
+# Process-wide telemetry shared by every task
+TELEMETRY = Telemetry()
+_CALLBACK_LOCK = threading.Lock()
+
+
+def _usage_value(usage, key):
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get(key) or 0
+    return getattr(usage, key, 0) or 0
+
+
+def litellm_success_callback(kwargs, response, start_time, end_time):
+    """
+    LiteLLM success callback recording latency, tokens and cost of every request.
+    """
+    metadata = (kwargs.get("litellm_params") or {}).get("metadata") or kwargs.get("metadata") or {}
+    component = metadata.get("component", "litellm")
+    try:
+        seconds = (end_time - start_time).total_seconds()
+    except AttributeError:
+        seconds = float(end_time - start_time)
+    usage = getattr(response, "usage", None)
+    prompt_tokens = _usage_value(usage, "prompt_tokens")
+    completion_tokens = _usage_value(usage, "completion_tokens")
+    cost = kwargs.get("response_cost") or 0.0
+    TELEMETRY.record_call(f"{component}.llm", seconds, prompt_tokens=prompt_tokens,
+                          completion_tokens=completion_tokens, cost=cost)
+    # LiteLLM reports the model without its provider prefix (e.g. "mistralai/..." for "openrouter/mistralai/...")
+    model = str(kwargs.get("model") or "unknown")
+    provider = kwargs.get("custom_llm_provider")
+    if provider and not model.startswith(f"{provider}/"):
+        model = f"{provider}/{model}"
+    TELEMETRY.record_model_usage(model, prompt_tokens, completion_tokens, cost)
+
+
+def install_litellm_callback():
+    """
+    Register the success callback with LiteLLM (once).
+    """
+    import litellm
+
+    with _CALLBACK_LOCK:
+        if litellm_success_callback not in litellm.success_callback:
+            litellm.success_callback.append(litellm_success_callback)
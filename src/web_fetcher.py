@@ -0,0 +1,161 @@
+"""
+Concurrent web page fetcher with connection pooling and an on-disk HTTP cache.
+
+Pages are fetched by a thread pool with an overall concurrency limit and a separate
+per-host limit. Each worker thread keeps its own requests.Session so connections stay
+alive across requests. Responses are cached on disk with their ETag / Last-Modified
+validators and revalidated with conditional requests, and bodies are read in a stream
+that stops after max_bytes so huge pages are never fully downloaded.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HTTP_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "http_cache")
+
+
+class HttpCache:
+    """
+    On-disk cache of response bodies and their validators, one JSON file per URL.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_HTTP_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def put(self, url, body, etag=None, last_modified=None):
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "body": body}
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+class WebFetcher:
+    """
+    Fetches pages concurrently.
+
+    Args:
+        concurrency (int): Maximum number of requests in flight overall.
+        per_host (int): Maximum number of requests in flight to any single host.
+        timeout (float): Connect/read timeout per request in seconds.
+        max_bytes (int): Stop reading a body after this many bytes (None for no limit).
+        cache (HttpCache): HTTP cache, or None to disable caching.
+    """
+
+    def __init__(self, concurrency=8, per_host=2, timeout=10, max_bytes=512 * 1024, cache=None):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self._local = threading.local()
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "not_modified": 0, "truncated": 0, "errors": 0}
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _read_body(self, resp):
+        chunks = []
+        size = 0
+        for chunk in resp.iter_content(chunk_size=16 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if self.max_bytes is not None and size >= self.max_bytes:
+                self._count("truncated")
+                break
+        body = b"".join(chunks)
+        if self.max_bytes is not None:
+            body = body[:self.max_bytes]
+        encoding = resp.encoding or "utf-8"
+        return body.decode(encoding, errors="replace")
+
+    def fetch(self, url):
+        """
+        Return the (possibly truncated) body of url as text. Raises on HTTP or network errors.
+        """
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self._host_slot(url):
+            with self._session().get(url, headers=headers, timeout=self.timeout, stream=True) as resp:
+                if resp.status_code == 304 and cached:
+                    self._count("not_modified")
+                    return cached["body"]
+                resp.raise_for_status()
+                body = self._read_body(resp)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+        self._count("fetched")
+        if self.cache and (etag or last_modified):
+            self.cache.put(url, body, etag=etag, last_modified=last_modified)
+        return body
+
+    def fetch_all(self, urls, on_error=None):
+        """
+        Fetch every URL concurrently and return the bodies in input order.
+        Failed fetches yield "" and are reported through on_error(url, exc) if given.
+        """
+        def fetch_one(url):
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                self._count("errors")
+                if on_error:
+                    on_error(url, e)
+                return ""
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(fetch_one, urls))
+
+    def print_summary(self):
+        s = self.stats
+        print(f"Fetched {s['fetched']} page(s), {s['not_modified']} served from HTTP cache, "
+              f"{s['truncated']} truncated, {s['errors']} error(s)")
@@ -0,0 +1,37 @@
+"""
+HTML pages keep their full text, one passage per line, so --context-tokens can find the
+passage that matters wherever it sits on the page.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from context_compaction import ContextCompactor  # noqa: E402
+from generate_html_content_classification_csv import extract_text_from_html  # noqa: E402
+
+NAV = "<nav><a>Home</a><a>About us</a><a>News</a><a>Contact</a></nav>"
+FOOTER = "<footer><p>Copyright 2024 Example Foundation. All rights reserved.</p></footer>"
+PASSAGE = "Applications for the 2025 research grant are open until 31 March; eligible teams may apply online."
+
+
+def make_page(i, with_passage=False):
+    filler = "".join(f"<p>Story {i}.{n}: our team visited partners and shared photos from the event.</p>"
+                     for n in range(40))
+    body = filler + (f"<p>{PASSAGE}</p>" if with_passage else "")
+    return f"<html><body>{NAV}{body}{FOOTER}</body></html>"
+
+
+def test_passage_past_2000_chars_survives_extraction_and_compaction():
+    pages = [extract_text_from_html(make_page(i, with_passage=i == 0)) for i in range(6)]
+    target = pages[0]
+    assert target.index(PASSAGE) > 2000
+    # One passage per line, so boilerplate lines repeat verbatim across pages
+    assert "Home" in target.splitlines()
+
+    compactor = ContextCompactor(token_budget=60).fit(pages)
+    compacted = compactor.compact(target, "Is the following HTML page a website of a funding opportunity?")
+    assert PASSAGE in compacted
+    assert "Copyright 2024 Example Foundation. All rights reserved." not in compacted
+    assert "Home" not in compacted.splitlines()